@@ -0,0 +1,63 @@
+"""Memory used per registered directive.
+
+Registers directives on a fresh app class and reports how many bytes
+of memory were allocated for each, as measured by ``tracemalloc``.
+This includes the :class:`dectate.config.Directive`, its
+:class:`dectate.config.CodeInfo` and the registration in the
+configurable, but not the decorated functions themselves.
+
+Usage::
+
+  $ python benchmarks/directive_memory.py [AMOUNT]
+"""
+from __future__ import print_function
+
+import gc
+import sys
+import tracemalloc
+
+import dectate
+
+
+class FooAction(dectate.Action):
+    def __init__(self, name):
+        self.name = name
+
+    def identifier(self):
+        return self.name
+
+    def perform(self, obj):
+        pass
+
+
+class App(dectate.App):
+    foo = dectate.directive(FooAction)
+
+
+def target():
+    pass
+
+
+def register(amount):
+    for i in range(amount):
+        App.foo(i)(target)
+
+
+def main():
+    amount = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    # register once first, so that one-time allocations are not counted
+    register(1)
+    del App.dectate._directives[:]
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    register(amount)
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print("%s directives: %.1f bytes per directive" % (
+        amount, float(after - before) / amount))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""Memory released by freezing committed apps.
+
+Registers and commits directives on a fresh app class, freezes it and
+reports how many bytes of memory per directive the commit kept
+allocated before and after freezing, as measured by ``tracemalloc``.
+This includes the config the actions were performed into.
+
+Usage::
+
+  $ python benchmarks/freeze_memory.py [AMOUNT] [--queries]
+"""
+from __future__ import print_function
+
+import gc
+import sys
+import tracemalloc
+
+import dectate
+
+
+class FooAction(dectate.Action):
+    config = {
+        'registry': dict
+    }
+
+    def __init__(self, name):
+        self.name = name
+
+    def identifier(self, registry):
+        return self.name
+
+    def perform(self, obj, registry):
+        registry[self.name] = obj
+
+
+class App(dectate.App):
+    foo = dectate.directive(FooAction)
+
+
+def target():
+    pass
+
+
+def main():
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('-')]
+    amount = int(args[0]) if args else 50000
+    queries = '--queries' in sys.argv
+    gc.collect()
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    for i in range(amount):
+        App.foo(i)(target)
+    dectate.commit(App)
+    gc.collect()
+    committed = tracemalloc.get_traced_memory()[0]
+    dectate.freeze(App, queries=queries)
+    gc.collect()
+    frozen = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print("%s directives, committed: %.1f bytes per directive" % (
+        amount, float(committed - start) / amount))
+    print("%s directives, frozen%s: %.1f bytes per directive" % (
+        amount, " (queries)" if queries else "",
+        float(frozen - start) / amount))
+
+
+if __name__ == '__main__':
+    main()
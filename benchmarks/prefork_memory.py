@@ -0,0 +1,108 @@
+"""Shared and private memory of forked workers after a commit.
+
+Registers and commits directives on an app class, optionally freezes
+it, and forks worker processes. Each worker does what a long running
+worker eventually does to the configuration: it looks up every
+registration and runs a full garbage collection. The workers then
+report how much of their memory is still shared with the parent
+process and how much has become private, as listed in
+``/proc/self/smaps_rollup``. This only works on Linux.
+
+Usage::
+
+  $ python benchmarks/prefork_memory.py [AMOUNT] [--freeze | --prefork]
+
+``--freeze`` freezes the app before forking, ``--prefork`` freezes it
+with ``prefork=True``.
+"""
+from __future__ import print_function
+
+import gc
+import os
+import sys
+
+import dectate
+
+
+class FooAction(dectate.Action):
+    config = {
+        'registry': dict
+    }
+
+    def __init__(self, name):
+        self.name = name
+
+    def identifier(self, registry):
+        return self.name
+
+    def perform(self, obj, registry):
+        registry[self.name] = obj
+
+
+class App(dectate.App):
+    foo = dectate.directive(FooAction)
+
+
+WORKERS = 4
+
+
+def memory():
+    """Shared and private memory of this process in kB."""
+    shared = private = 0
+    with open('/proc/self/smaps_rollup') as f:
+        for line in f:
+            name, value = line.split(':', 1)
+            if name.startswith('Shared_'):
+                shared += int(value.split()[0])
+            elif name.startswith('Private_'):
+                private += int(value.split()[0])
+    return shared, private
+
+
+def work():
+    registry = App.config.registry
+    for name in registry:
+        registry[name]
+    gc.collect()
+
+
+def main():
+    if not os.path.exists('/proc/self/smaps_rollup'):
+        sys.exit("This benchmark needs /proc/self/smaps_rollup (Linux).")
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('-')]
+    amount = int(args[0]) if args else 200000
+    for i in range(amount):
+        # a function per directive, like in a real application
+        App.foo(i)(lambda: None)
+    dectate.commit(App)
+    if '--prefork' in sys.argv:
+        mode = 'freeze(prefork=True)'
+        dectate.freeze(App, prefork=True)
+    elif '--freeze' in sys.argv:
+        mode = 'freeze()'
+        dectate.freeze(App)
+    else:
+        mode = 'commit only'
+        gc.collect()
+    results = []
+    for i in range(WORKERS):
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            work()
+            os.write(write_fd, ('%s %s' % memory()).encode('ascii'))
+            os._exit(0)
+        os.close(write_fd)
+        data = os.read(read_fd, 100)
+        os.close(read_fd)
+        os.waitpid(pid, 0)
+        results.append([int(value) for value in data.split()])
+    shared = sum(result[0] for result in results) // WORKERS
+    private = sum(result[1] for result in results) // WORKERS
+    print("%s directives, %s: per worker %s kB shared, %s kB private" % (
+        amount, mode, shared, private))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,10 +1,11 @@
 # flake8: noqa
-from .app import App, directive
+from .app import App, directive, unregister_module, reload_modules
 from .sentinel import Sentinel, NOT_FOUND
-from .config import commit, Action, Composite, CodeInfo
+from .config import commit, freeze, Action, Composite, CodeInfo
 from .error import (ConfigError, DirectiveError, TopologicalSortError,
                     DirectiveReportError, ConflictError, QueryError)
 from .query import Query
 from .tool import (query_tool,
                    convert_dotted_name, convert_bool, query_app)
+from .scan import scan
 from .toposort import topological_sort
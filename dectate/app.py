@@ -1,6 +1,13 @@
+import linecache
 import sys
-from .config import Configurable, Directive, commit, create_code_info
-from .compat import with_metaclass
+import threading
+from .config import (Configurable, Directive, commit, commit_uncommitted,
+                     create_code_info)
+from .compat import with_metaclass, reload
+
+# guards the creation of configurations, which can create the
+# configurations they need in turn
+config_lock = threading.RLock()
 
 
 class Config(object):
@@ -8,8 +15,56 @@ class Config(object):
 
     The configurations are specified by the :attr:`Action.config`
     class attribute of :class:`Action`.
+
+    Configurations are created when they are first accessed, along with
+    the configurations their factory needs. Until then only the way to
+    create them is known.
+
+    If the app class has :attr:`App.commit_on_access` set, the first
+    access of a configuration commits the app if it was not committed
+    yet. This is done with ``snapshot=True`` (see :func:`commit`), so
+    that no configuration is seen before the commit is complete; this
+    config object then looks up configurations on the new one.
     """
-    pass
+    def __init__(self):
+        # maps names of configurations not yet created to a function
+        # that creates them
+        self._factories = {}
+        # the configurable to commit on first access, if any
+        self._configurable = None
+        self._committing = False
+
+    def __getattr__(self, name):
+        # only called if there is no such attribute (yet)
+        if name.startswith('__'):
+            raise AttributeError(name)
+        d = self.__dict__
+        with config_lock:
+            if name in d:
+                # created by another thread in the meantime
+                return d[name]
+            factories = d.get('_factories')
+            create = factories.get(name) if factories else None
+            if create is not None:
+                value = create()
+                setattr(self, name, value)
+                del factories[name]
+                return value
+            configurable = d.get('_configurable')
+            if configurable is None or d.get('_committing'):
+                # the commit itself accesses it too
+                raise AttributeError(name)
+            if not configurable.committed:
+                self._committing = True
+                try:
+                    commit_uncommitted(configurable, snapshot=True)
+                finally:
+                    self._committing = False
+            config = configurable.config
+            if config is self:
+                raise AttributeError(name)
+        # the commit replaced this config object
+        return getattr(config, name)
 
 
 class AppMeta(type):
@@ -24,6 +79,8 @@ class AppMeta(type):
         d['dectate'] = configurable = Configurable(extends, config)
         result = super(AppMeta, cls).__new__(cls, name, bases, d)
         configurable.app_class = result
+        if result.commit_on_access:
+            config._configurable = configurable
         return result
 
 
@@ -63,6 +120,18 @@ class App(with_metaclass(AppMeta)):
     attributes that contain the real configuration.
     """
 
+    commit_on_access = False
+    """Commit the app when its configuration is first accessed.
+
+    Set this to ``True`` to commit the app, and the apps it extends
+    that were not committed yet, on first access of an attribute of
+    :attr:`App.config`, instead of committing it explicitly. This is
+    thread-safe: the configuration is built on a new config object
+    that replaces :attr:`App.config` when it is complete, so other
+    threads never see it half-way. Apps that are never used are then
+    never committed.
+    """
+
     @classmethod
     def get_directive_methods(cls):
         for name in dir(cls):
@@ -92,6 +161,9 @@ class App(with_metaclass(AppMeta)):
     def is_committed(cls):
         """True if this app class was ever committed.
 
+        This includes a partial commit, see ``commit(..., only=...)``;
+        ``cls.dectate.partial`` tells whether the last commit was one.
+
         :return: bool that is ``True`` when the app was committed before.
         """
         return cls.dectate.committed
@@ -141,3 +213,123 @@ def directive(action_factory):
     method.__doc__ = action_factory.__doc__
     method.__module__ = action_factory.__module__
     return classmethod(method)
+
+
+def all_app_classes():
+    """Get all :class:`App` subclasses that exist.
+
+    :return: a list of app classes.
+    """
+    result = []
+    seen = set()
+    stack = [App]
+    while stack:
+        for app_class in stack.pop().__subclasses__():
+            if app_class in seen:
+                continue
+            seen.add(app_class)
+            result.append(app_class)
+            stack.append(app_class)
+    return result
+
+
+def unregister_module(name):
+    """Unregister the directives used in a module from all apps.
+
+    Apps that are frozen are left alone. The apps are not committed
+    again; use :func:`reload_modules` to reload modules and commit the
+    affected apps.
+
+    :param name: the name of the module.
+    :return: a list of the app classes directives were unregistered
+      from.
+    """
+    return [app_class for app_class in all_app_classes()
+            if not app_class.dectate.frozen and
+            app_class.dectate.unregister_module(name)]
+
+
+def reload_modules(*names):
+    """Reload modules and commit the apps affected by them again.
+
+    The directives used in the modules are unregistered, the modules
+    are reloaded in the given order, which registers their directives
+    anew, and the committed apps that have directives from the modules,
+    or that extend an app that has, are committed again. This is done
+    with ``snapshot=True`` (see :func:`commit`), so that the
+    configuration can be reloaded while the apps are in use.
+
+    If a reloaded module defines an app class that was committed, the
+    new version of the app class is committed instead. As the old
+    version of the app class is replaced, the modules that define
+    subclasses of it or use directives on it are reloaded after it as
+    well, so that these are set up on the new version.
+
+    :param ``*names``: names of loaded modules.
+    :return: a list of the app classes that were committed.
+    """
+    names = dependent_modules(names)
+    modules = [sys.modules[name] for name in names]
+    affected = set()
+    for name in names:
+        for app_class in unregister_module(name):
+            affected.add(app_class.dectate)
+    committed = [app_class for app_class in all_app_classes()
+                 if app_class.is_committed() and not app_class.dectate.frozen]
+    for module in modules:
+        filename = getattr(module, '__file__', None)
+        if filename is not None:
+            linecache.checkcache(filename)
+        reload(module)
+    for app_class in all_app_classes():
+        configurable = app_class.dectate
+        if not configurable.frozen and any(
+                directive.code_info.module in names
+                for directive, obj in configurable._directives):
+            affected.add(configurable)
+    result = []
+    for app_class in committed:
+        if app_class.__module__ in names:
+            new_app_class = getattr(sys.modules[app_class.__module__],
+                                    app_class.__name__, None)
+            if new_app_class is not app_class:
+                if isinstance(new_app_class, AppMeta):
+                    result.append(new_app_class)
+                continue
+        if any(base.__dict__.get('dectate') in affected
+               for base in app_class.__mro__):
+            result.append(app_class)
+    commit(*result, snapshot=True)
+    return result
+
+
+def dependent_modules(names):
+    """Get the modules to reload along with modules that define apps.
+
+    The app classes defined in a module are replaced when it is
+    reloaded. Modules that define subclasses of them, or use
+    directives on them, therefore need to be reloaded after it.
+
+    :param names: names of loaded modules.
+    :return: a list of the names and the names of the modules that
+      depend on them, each after the modules they depend on.
+    """
+    result = list(names)
+    app_classes = [app_class for app_class in all_app_classes()
+                   if not app_class.dectate.frozen]
+    i = 0
+    while i < len(result):
+        name = result[i]
+        i += 1
+        for app_class in app_classes:
+            if app_class.__module__ != name:
+                continue
+            dependents = [other.__module__ for other in app_classes
+                          if issubclass(other, app_class)]
+            dependents.extend(directive.code_info.module for directive, obj
+                              in app_class.dectate._directives)
+            for dependent in dependents:
+                if (dependent is not None and dependent not in result and
+                        dependent in sys.modules):
+                    result.append(dependent)
+    return result
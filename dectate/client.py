@@ -0,0 +1,122 @@
+from __future__ import print_function
+
+import argparse
+import json
+import socket
+import sys
+from .compat import text_type
+from .completion import complete, BASH_COMPLETION
+from .index import query_index, IndexFileError
+from .tool import ToolError, QueryArgumentParser, parse_filters
+
+
+class ClientError(Exception):
+    pass
+
+
+def query_client():
+    """Command-line client for ``decq`` query servers and index files.
+
+    This does not import your project, so it starts quickly.
+
+    usage: decq-client [-h] (--socket SOCKET | --index FILE) [--app APP]
+                       directive <filter>
+           decq-client --index FILE --complete LINE
+           decq-client --bash-completion
+
+    Query a server started with ``decq --serve``. All arguments except
+    ``--socket`` are passed to the server and are the same as for
+    :func:`dectate.query_tool`::
+
+      $ decq-client --socket=/tmp/decq.sock foo name=alpha
+
+    Query an index file written by ``decq --export-index``. Filter
+    values are compared with the text form of the values in the index,
+    and ``--app`` takes dotted names of apps in the index::
+
+      $ decq-client --index=decq.db foo name=alpha
+
+    Complete a ``decq`` command line using an index file. This is used
+    by the bash completion script that ``--bash-completion`` prints.
+    The script uses the index file in ``$DECQ_INDEX``, or ``decq.db``
+    in the current directory::
+
+      $ eval "$(decq-client --bash-completion)"
+    """
+    parser = argparse.ArgumentParser(
+        description="Query Dectate actions using a query server or index")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--socket',
+                       help="Path of the Unix socket of the server.")
+    group.add_argument('--index', metavar='FILE',
+                       help="Path of the index file.")
+    parser.add_argument('--complete', metavar='LINE',
+                        help="Complete a decq command line using the "
+                        "index file.")
+    parser.add_argument('--bash-completion', action='store_true',
+                        help="Print a bash completion script for decq.")
+    args, argv = parser.parse_known_args()
+    if args.bash_completion:
+        sys.stdout.write(BASH_COMPLETION)
+        return
+    if args.socket is None and args.index is None:
+        parser.error("one of the arguments --socket --index is required")
+    try:
+        if args.complete is not None:
+            if args.index is None:
+                parser.error("--complete requires --index")
+            lines = complete(args.index, args.complete)
+        elif args.index is not None:
+            lines = list(index_query_lines(args.index, argv))
+        else:
+            lines = send_query(args.socket, argv)
+        for line in lines:
+            print(line)
+    except (ClientError, ToolError, IndexFileError) as e:
+        parser.error(text_type(e))
+
+
+def index_query_lines(path, argv):
+    """Output lines for a query of an index file.
+
+    :param path: the path of the index file.
+    :param argv: a list of command-line arguments for the query.
+    :return: iterable of lines.
+    """
+    parser = QueryArgumentParser()
+    parser.add_argument('--app', action='append')
+    parser.add_argument('directive')
+    args, filters = parser.parse_known_args(argv)
+    return query_index(path, args.directive, parse_filters(filters),
+                       args.app)
+
+
+def send_query(path, argv):
+    """Send a query to a query server.
+
+    :param path: the path of the Unix socket of the server.
+    :param argv: a list of command-line arguments for the query.
+    :return: iterable of lines of output.
+    """
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        try:
+            sock.connect(path)
+        except socket.error as e:
+            raise ClientError("Cannot connect to %s: %s" % (path, e))
+        sock.sendall((json.dumps({'argv': argv}) + '\n').encode('utf-8'))
+        f = sock.makefile('rb')
+        try:
+            for line in f:
+                message = json.loads(line.decode('utf-8'))
+                if 'line' in message:
+                    yield message['line']
+                elif message.get('status'):
+                    raise ClientError(message.get('error', "Query failed."))
+                else:
+                    return
+        finally:
+            f.close()
+    finally:
+        sock.close()
+    raise ClientError("Connection closed by server.")
@@ -39,3 +39,24 @@ def with_metaclass(meta, *bases):
         def __new__(cls, name, this_bases, attrs):
             return meta(name, bases, attrs)
     return type.__new__(metaclass, 'temporary_class', (), {})
+
+
+try:
+    import socketserver
+except ImportError:
+    import SocketServer as socketserver  # noqa: F401
+
+try:
+    from inspect import getfullargspec as getargspec
+except ImportError:
+    from inspect import getargspec  # noqa: F401
+
+try:
+    from importlib import reload
+except ImportError:
+    from imp import reload  # noqa: F401
+
+try:
+    from cStringIO import StringIO
+except ImportError:
+    from io import StringIO  # noqa: F401
@@ -0,0 +1,115 @@
+"""Shell completion for ``decq``.
+
+Completions are looked up in an index file written by ``decq
+--export-index``, so completing does not import the project the apps
+are defined in.
+"""
+import shlex
+from .index import (open_index, indexed_apps, indexed_directives,
+                    indexed_filters, indexed_values)
+
+# options of decq, and whether they take a value
+OPTIONS = {
+    '--app': True,
+    '--uncommitted': False,
+    '--format': True,
+    '--jobs': True,
+    '--serve': True,
+    '--reload': False,
+    '--export-index': True,
+    '--batch': False,
+    '--watch': False,
+    '--stats': False,
+    '--shell': False,
+}
+
+FORMATS = ['csv', 'json', 'ndjson', 'text']
+
+BASH_COMPLETION = """\
+_decq()
+{
+    local IFS=$'\\n'
+    COMPREPLY=($(decq-client --index="${DECQ_INDEX:-decq.db}" \\
+                 --complete "${COMP_LINE:0:$COMP_POINT}" 2>/dev/null))
+}
+complete -o nospace -F _decq decq
+"""
+
+
+def complete(path, line):
+    """Complete a ``decq`` command line.
+
+    Completes option names, dotted names of apps for ``--app``,
+    directive names, filter names of the directive and filter values.
+    Only the apps given with ``--app`` are taken into account, or all
+    apps in the index if there are none.
+
+    Completions of a whole word end with a space. As bash splits words
+    at ``=``, completions only contain what comes after the last ``=``
+    of the word that is completed.
+
+    :param path: the path of the index file.
+    :param line: the command line up to the cursor, including the
+      name of the command.
+    :return: a list of completions.
+    """
+    try:
+        words = shlex.split(line)
+    except ValueError:
+        return []  # unbalanced quotes
+    if not line or line[-1].isspace():
+        words.append('')
+    words = words[1:]
+    if not words:
+        return []
+    current = words.pop()
+    option = None
+    app_names = []
+    directive = None
+    for word in words:
+        if option is not None:
+            if option == '--app':
+                app_names.append(word)
+            option = None
+        elif word.startswith('--'):
+            name, sep, value = word.partition('=')
+            if name == '--app' and sep:
+                app_names.append(value)
+            elif OPTIONS.get(name) and not sep:
+                option = name
+        elif directive is None:
+            directive = word
+    db = open_index(path)
+    try:
+        candidates = candidates_for(db, current, option, app_names or None,
+                                    directive)
+    finally:
+        db.close()
+    cut = current.rfind('=') + 1
+    return [candidate[cut:] for candidate in candidates
+            if candidate.startswith(current)]
+
+
+def candidates_for(db, current, option, app_names, directive):
+    if option is None and current.startswith('-'):
+        name, sep, value = current.partition('=')
+        if not sep:
+            return [option_name + ('=' if OPTIONS[option_name] else ' ')
+                    for option_name in sorted(OPTIONS)]
+        option, prefix = name, name + '='
+    else:
+        prefix = ''
+    if option == '--app':
+        return [prefix + name + ' ' for name in indexed_apps(db)]
+    if option == '--format':
+        return [prefix + name + ' ' for name in FORMATS]
+    if option is not None:
+        return []
+    if directive is None:
+        return [name + ' ' for name in indexed_directives(db, app_names)]
+    name, sep, value = current.partition('=')
+    if not sep:
+        return [name + '=' for name in
+                indexed_filters(db, directive, app_names)]
+    return [name + '=' + value + ' ' for value in
+            indexed_values(db, directive, name, app_names)]
@@ -1,15 +1,28 @@
 import abc
+import copy
+import functools
+import gc
+import itertools
+import linecache
 import logging
 import sys
 import inspect
+import threading
+import time
 from .error import (
     ConflictError, ConfigError, DirectiveError, DirectiveReportError)
 from .toposort import topological_sort
-from .compat import with_metaclass
+from .compat import with_metaclass, string_types
 from .sentinel import NOT_FOUND
 
 
-order_count = 0
+# gives the order in which actions were created
+order_counter = itertools.count()
+
+# guards the registration of directives from multiple threads
+registration_lock = threading.Lock()
+
+timer = getattr(time, 'perf_counter', time.time)
 
 
 class Configurable(object):
@@ -47,6 +60,15 @@ class Configurable(object):
         self._directives = []
         # have we ever been committed
         self.committed = False
+        # how many seconds the last commit took
+        self.commit_duration = None
+        # was the last commit restricted to some action groups
+        self.partial = False
+        # the action classes of the action groups the last commit
+        # executed, or None if it executed all of them
+        self._only = None
+        # frozen configurables cannot be changed anymore
+        self.frozen = False
 
     def register_directive(self, directive, obj):
         """Register a directive with this configurable.
@@ -58,7 +80,26 @@ class Configurable(object):
         :param obj: the object the directive was invoked on; typically
           a function or a class it was invoked on as a decorator.
         """
-        self._directives.append((directive, obj))
+        if self.frozen:
+            raise ConfigError(
+                "Cannot use directive on frozen app: %r" % self.app_class)
+        with registration_lock:
+            self._directives.append((directive, obj))
+
+    def unregister_module(self, name):
+        """Unregister the directives used in a module.
+
+        :param name: the name of the module.
+        :return: ``True`` if any directives were unregistered.
+        """
+        with registration_lock:
+            directives = [(directive, obj) for (directive, obj)
+                          in self._directives
+                          if directive.code_info.module != name]
+            if len(directives) == len(self._directives):
+                return False
+            self._directives = directives
+        return True
 
     def _fixup_directive_names(self):
         """Set up correct name for directives.
@@ -132,20 +173,24 @@ class Configurable(object):
         seen = self._factories_seen
 
         config = self.config
+        # the configurations to create when they are first accessed
+        factories = config.__dict__.get('_factories')
         for name, factory in items:
             # if we already have this set up, we don't want to create
             # it anew
-            configured = getattr(config, name, None)
-            if configured is not None:
+            if name in seen:
                 if seen[name] is not factory:
                     raise ConfigError(
                         "Inconsistent factories for config %r (%r and %r)" % (
                             (name, seen[name], factory)))
                 continue
             seen[name] = factory
-            kw = get_factory_arguments(action_class, config, factory,
-                                       self.app_class)
-            setattr(config, name, factory(**kw))
+            create = functools.partial(create_config, action_class, config,
+                                       factory, self.app_class)
+            if factories is None:
+                setattr(config, name, create())
+            else:
+                factories[name] = create
 
     def delete_config(self, action_class):
         """Delete config objects on the ``config`` attribute.
@@ -154,21 +199,28 @@ class Configurable(object):
         """
         config = self.config
         for name, factory in action_class.config.items():
-            if hasattr(config, name):
-                delattr(config, name)
+            delete_config_item(config, name)
             factory_arguments = getattr(factory, 'factory_arguments', None)
             if factory_arguments is None:
                 continue
             for name in factory_arguments.keys():
-                if hasattr(config, name):
-                    delattr(config, name)
+                delete_config_item(config, name)
 
-    def group_actions(self):
+    def group_actions(self, only=None):
         """Groups actions for this configurable into action groups.
+
+        :param only: if not ``None``, a set of action classes of the
+          action groups to fill; actions of other groups are skipped
+          where possible.
         """
+        directives = self._directives
+        if only is not None:
+            directives = [
+                (directive, obj) for (directive, obj) in directives
+                if may_group_into(directive.action_factory, only)]
         # turn directives into actions
         actions = [(directive.action(), obj)
-                   for (directive, obj) in self._directives]
+                   for (directive, obj) in directives]
 
         # add the actions for this configurable to the action group
         d = self._action_groups
@@ -177,7 +229,8 @@ class Configurable(object):
             action_class = action.group_class
             if action_class is None:
                 action_class = action.__class__
-            d[action_class].add(action, obj)
+            if only is None or action_class in only:
+                d[action_class].add(action, obj)
 
     def get_action_group(self, action_class):
         """Return ActionGroup for ``action_class`` or ``None`` if not found.
@@ -185,6 +238,10 @@ class Configurable(object):
         :param action_class: the action class to find the action group of.
         :return: an ``ActionGroup`` instance.
         """
+        if self._action_groups is None:
+            raise ConfigError(
+                "App was frozen without keeping what is needed for "
+                "queries: %r" % self.app_class)
         return self._action_groups.get(action_class, None)
 
     def action_extends(self, action_class):
@@ -199,15 +256,60 @@ class Configurable(object):
                                             ActionGroup(action_class, []))
             for configurable in self.extends]
 
-    def execute(self):
+    def introspect(self):
+        """Group actions for this configurable without committing.
+
+        :return: an :class:`Introspection` instance.
+        """
+        return Introspection(self)
+
+    def execute(self, only=None, snapshot=False):
         """Execute actions for configurable.
+
+        :param only: if not ``None``, a set of action classes of the
+          action groups to execute. Other action groups stay empty.
+        :param snapshot: if true, execute on a copy of this configurable
+          with a new config object, and only replace the config and
+          action groups of this configurable and the ``config`` of the
+          app class once that is done.
         """
+        if snapshot:
+            shadow = copy.copy(self)
+            shadow.config = type(self.config)()
+            shadow.execute(only)
+            self.__dict__.update(shadow.__dict__)
+            self.app_class.config = self.config
+            return
+        start = timer()
         self.app_class.clean()
         self.setup()
-        self.group_actions()
+        self.group_actions(only)
         for action_class in sort_action_classes(self._action_groups.keys()):
-            self._action_groups[action_class].execute(self)
+            if only is None or action_class in only:
+                self._action_groups[action_class].execute(self)
         self.committed = True
+        self.partial = only is not None
+        self._only = only
+        self.commit_duration = timer() - start
+
+    def freeze(self, queries=False):
+        """Freeze this configurable.
+
+        Drops the state that is only needed to commit again or to
+        introspect. With ``queries`` the action groups are kept, so
+        the configurable can still be queried and apps that extend it
+        can still be committed.
+
+        :param queries: if true, keep what is needed for queries.
+        """
+        self.frozen = True
+        self._directives = None
+        self._factories_seen = None
+        if not queries:
+            self._action_groups = None
+        elif self._action_groups is not None:
+            for action_group in self._action_groups.values():
+                action_group.freeze()
 
 
 class ActionGroup(object):
@@ -218,6 +320,8 @@ class ActionGroup(object):
     Normally actions are grouped by their class, but actions can also
     indicate another action class to group with using ``group_class``.
     """
+    __slots__ = ['action_class', '_actions', '_action_map', 'extends']
+
     def __init__(self, action_class, extends):
         """
         :param action_class:
@@ -289,6 +393,14 @@ class ActionGroup(object):
         to_combine.update(self._action_map)
         self._action_map = to_combine
 
+    def freeze(self):
+        """Drop what is only needed to execute the group again.
+
+        The combined actions stay available with :meth:`get_actions`.
+        """
+        self._actions = None
+        self.extends = None
+
     def execute(self, configurable):
         """Perform actions for configurable.
 
@@ -297,6 +409,12 @@ class ActionGroup(object):
         """
         self.prepare(configurable)
 
+        action_class = self.action_class
+        if (not self._action_map and action_class.before is Action.before and
+                action_class.after is Action.after):
+            # nothing to do, so don't create the config either
+            return
+
         kw = self.action_class._get_config_kw(configurable)
 
         # run the group class before operation
@@ -315,6 +433,83 @@ class ActionGroup(object):
         self.action_class.after(**kw)
 
 
+class Introspection(object):
+    """Actions of a configurable grouped without committing it.
+
+    The directives registered with the configurable and the ones it
+    extends are turned into actions, composites are expanded and the
+    actions are grouped by action class. No config is set up and no
+    actions are performed, so this is cheap compared to a commit.
+
+    As identifiers need config to be computed, overrides and conflicts
+    are not resolved: an action overridden in an extending
+    configurable is included along with the one overriding it.
+
+    This has the same ``app_class`` attribute and ``get_action_group``
+    method as :class:`Configurable`, so queries can be executed
+    against it.
+    """
+    def __init__(self, configurable):
+        """
+        :param configurable: the :class:`Configurable` to introspect.
+        """
+        self.app_class = configurable.app_class
+        self._action_groups = d = {}
+        for action_class in group_action_classes(
+                configurable.get_action_classes().keys()):
+            d[action_class] = IntrospectionGroup(action_class)
+        # each configurable is visited once, even if it is reached
+        # through more than one of the configurables extended
+        for c in sort_configurables([configurable]):
+            if c.frozen:
+                raise ConfigError(
+                    "Cannot introspect frozen app: %r" % c.app_class)
+            actions = [(directive.action(), obj)
+                       for (directive, obj) in c._directives]
+            for action, obj in expand_actions(actions):
+                action_class = action.group_class
+                if action_class is None:
+                    action_class = action.__class__
+                d[action_class].add(action, obj)
+
+    def get_action_group(self, action_class):
+        """Return group for ``action_class`` or ``None`` if not found.
+
+        :param action_class: the action class to find the group of.
+        :return: an :class:`IntrospectionGroup` instance.
+        """
+        return self._action_groups.get(action_class, None)
+
+
+class IntrospectionGroup(object):
+    """A group of actions collected by :class:`Introspection`.
+    """
+    def __init__(self, action_class):
+        """
+        :param action_class:
+          the action_class that identifies this group.
+        """
+        self.action_class = action_class
+        self._actions = []
+
+    def add(self, action, obj):
+        """Add an action and the object this action is to be performed on.
+
+        :param action: an :class:`Action` instance.
+        :param obj: the function or class the action should be performed for.
+        """
+        self._actions.append((action, obj))
+
+    def get_actions(self):
+        """Get all actions in this group.
+
+        These include the actions of the configurables extended.
+
+        :return: list of action instances in registration order.
+        """
+        return sorted(self._actions, key=lambda value: value[0].order or 0)
+
+
 class Action(with_metaclass(abc.ABCMeta)):
     """A configuration action.
 
@@ -667,6 +862,8 @@ class Directive(object):
     When used as a decorator this tracks where in the source code
     the directive was used for the purposes of error reporting.
     """
+    __slots__ = ['action_factory', 'code_info', 'app_class', 'args', 'kw']
+
     def __init__(self, action_factory, code_info, app_class, args, kw):
         """
         :param action_factory: function that constructs an action instance.
@@ -680,10 +877,18 @@ class Directive(object):
         self.action_factory = action_factory
         self.code_info = code_info
         self.app_class = app_class
-        self.configurable = app_class.dectate
         self.args = args
         self.kw = kw
-        self.argument_info = (args, kw)
+
+    @property
+    def configurable(self):
+        """The :class:`Configurable` of the app class."""
+        return self.app_class.dectate
+
+    @property
+    def argument_info(self):
+        """The ``args, kw`` tuple passed into the directive."""
+        return self.args, self.kw
 
     def action(self):
         """Get the :class:`Action` instance represented by this directive.
@@ -780,7 +985,7 @@ class DirectiveAbbreviation(object):
             kw=combined_kw)
 
 
-def commit(*apps):
+def commit(*apps, **kw):
     """Commit one or more app classes
 
     A commit causes the configuration actions to be performed. The
@@ -791,9 +996,35 @@ def commit(*apps):
     This function may safely be invoked multiple times -- each time
     the known configuration is recommitted.
 
+    Pass ``only`` to perform only the actions of some directives, and
+    of the directives these depend on. The other action groups stay
+    empty, and the ``partial`` attribute of the configurables of the
+    apps is set. Querying the empty action groups raises
+    :exc:`QueryError`. Apps that the apps extend and that were fully
+    committed before are left as they are. A later commit without
+    ``only`` commits everything.
+
+    Pass ``snapshot=True`` to commit apps that are in use, for instance
+    by other threads. Normally a commit changes the ``config`` of an
+    app in place, so it can be seen half-way. With ``snapshot`` the
+    configuration is built on a new config object, which replaces the
+    ``config`` of the app class when it is complete. Until then the
+    previous configuration stays available as it was. Anything that
+    :meth:`App.clean` changes is still changed in place.
+
     :param `*apps`: one or more :class:`App` subclasses to perform
       configuration actions on.
+    :param only: a list of directive names or action classes to
+      perform the actions of. Composite actions need to have
+      ``query_classes``.
+    :param snapshot: if true, replace the config of each app at once
+      when its commit is complete.
     """
+    only = kw.pop('only', None)
+    snapshot = kw.pop('snapshot', False)
+    if kw:
+        raise TypeError("Unexpected keyword arguments: %s" %
+                        ', '.join(sorted(kw)))
     configurables = []
     for c in apps:
         if isinstance(c, Configurable):
@@ -801,8 +1032,160 @@ def commit(*apps):
         else:
             configurables.append(c.dectate)
 
+    if only is not None:
+        only = only_action_classes(configurables, only)
+
     for configurable in sort_configurables(configurables):
-        configurable.execute()
+        if configurable.frozen:
+            if configurable in configurables:
+                raise ConfigError(
+                    "Cannot commit frozen app: %r" % configurable.app_class)
+            if configurable._action_groups is None:
+                raise ConfigError(
+                    "Cannot commit app that extends app frozen without "
+                    "keeping what is needed for queries: %r" %
+                    configurable.app_class)
+            continue  # its configuration is final
+        if (only is not None and configurable not in configurables and
+                configurable.committed and not configurable.partial):
+            continue  # don't lose what it has beyond only
+        configurable.execute(only, snapshot)
+
+
+def commit_uncommitted(configurable, snapshot=False):
+    """Commit a configurable and what it extends, if not committed yet.
+
+    Unlike :func:`commit`, configurables that were committed before
+    are not committed again.
+
+    :param configurable: the :class:`Configurable` to commit.
+    :param snapshot: if true, replace the config of each app at once
+      when its commit is complete, like :func:`commit` does.
+    """
+    for c in sort_configurables([configurable]):
+        if not c.committed:
+            c.execute(snapshot=snapshot)
+
+
+def only_action_classes(configurables, only):
+    """Get the action groups to execute for a partial commit.
+
+    :param configurables: the configurables to commit.
+    :param only: a list of directive names or action classes.
+    :return: the set of action classes of the action groups to
+      execute, including the ones they depend on.
+    """
+    action_classes = []
+    for item in only:
+        if not isinstance(item, string_types):
+            action_classes.append(item)
+            continue
+        for configurable in configurables:
+            method = getattr(configurable.app_class, item, None)
+            action_factory = getattr(method, 'action_factory', None)
+            if action_factory is not None:
+                action_classes.append(action_factory)
+                break
+        else:
+            raise ConfigError("No directive with name: %s" % item)
+    result = set()
+    for action_class in action_classes:
+        group_classes = get_group_classes(action_class)
+        if group_classes is None:
+            raise ConfigError(
+                "Cannot commit only composite action %r without "
+                "query_classes" % action_class)
+        result.update(group_classes)
+    stack = list(result)
+    while stack:
+        for depend in stack.pop().depends:
+            if depend not in result:
+                result.add(depend)
+                stack.append(depend)
+    return result
+
+
+def get_group_classes(action_class):
+    """Get the action groups actions of an action class end up in.
+
+    :param action_class: an :class:`Action` or :class:`Composite`
+      subclass.
+    :return: a set of action classes of action groups, or ``None``
+      if it is a composite that doesn't have ``query_classes``.
+    """
+    if not issubclass(action_class, Composite):
+        return set([action_class.group_class or action_class])
+    if not action_class.query_classes:
+        return None
+    result = set()
+    for query_class in action_class.query_classes:
+        group_classes = get_group_classes(query_class)
+        if group_classes is None:
+            return None
+        result.update(group_classes)
+    return result
+
+
+def may_group_into(action_class, only):
+    """Check whether actions of a class can end up in some action groups.
+
+    :param action_class: an :class:`Action` or :class:`Composite`
+      subclass.
+    :param only: a set of action classes of action groups.
+    :return: ``False`` if no action created by ``action_class`` can end
+      up in these action groups.
+    """
+    group_classes = get_group_classes(action_class)
+    return group_classes is None or not group_classes.isdisjoint(only)
+
+
+def freeze(*apps, **kw):
+    """Freeze one or more committed app classes.
+
+    Use this after the final commit, when the configuration of the
+    apps will not change anymore, to release the memory used by the
+    state that is only needed to commit them again or to introspect
+    them. Directives can no longer be used on frozen apps, and they
+    cannot be committed again.
+
+    By default the actions of the apps are dropped as well, so they
+    can no longer be queried and apps that extend them cannot be
+    committed. Pass ``queries=True`` to keep them.
+
+    Only the given apps are frozen, not the apps they extend.
+
+    Pass ``prefork=True`` if you fork worker processes afterwards. All
+    objects that exist at that point, including the configuration, are
+    then moved out of reach of the garbage collector using
+    :func:`gc.freeze`, so that collections in the workers do not write
+    to the memory pages they share with the parent process. On Python
+    versions without :func:`gc.freeze` only a collection is done.
+
+    :param `*apps`: one or more committed :class:`App` subclasses to
+      freeze.
+    :param queries: if true, keep what is needed for queries.
+    :param prefork: if true, prepare for forking worker processes.
+    """
+    queries = kw.pop('queries', False)
+    prefork = kw.pop('prefork', False)
+    if kw:
+        raise TypeError("Unexpected keyword arguments: %s" %
+                        ', '.join(sorted(kw)))
+    configurables = []
+    for c in apps:
+        if not isinstance(c, Configurable):
+            c = c.dectate
+        if not c.committed:
+            raise ConfigError("Cannot freeze uncommitted app: %r" %
+                              c.app_class)
+        configurables.append(c)
+    for configurable in configurables:
+        configurable.freeze(queries)
+    if prefork:
+        # collect the garbage first, so it is not frozen along
+        gc.collect()
+        if hasattr(gc, 'freeze'):
+            gc.freeze()
 
 
 def sort_configurables(configurables):
@@ -885,9 +1268,7 @@ def expand_actions(actions):
                 yield sub_action, sub_obj
         else:
             if not hasattr(action, 'order'):
-                global order_count
-                action.order = order_count
-                order_count += 1
+                action.order = next(order_counter)
             yield action, obj
 
 
@@ -901,33 +1282,70 @@ class CodeInfo(object):
 
     The ``sourceline`` attribute contains the actual source line that
     did the invocation.
+
+    The ``module`` attribute gives the name of the module the code was
+    invoked in, if known.
+
+    Instead of the source line, the lines of the file can be given.
+    These are shared by all code info objects for the same file, and
+    the source line is only looked up in them when it is needed.
     """
-    def __init__(self, path, lineno, sourceline):
+    __slots__ = ['path', 'lineno', 'module', '_source']
+
+    def __init__(self, path, lineno, sourceline, lines=None, module=None):
         self.path = path
         self.lineno = lineno
-        self.sourceline = sourceline
+        self.module = module
+        # either the source line, or the lines of the file to find it in
+        self._source = sourceline if lines is None else lines
+
+    @property
+    def sourceline(self):
+        source = self._source
+        if not isinstance(source, list):
+            return source
+        try:
+            return source[self.lineno - 1].strip()
+        except IndexError:
+            # if no source file exists, e.g., due to eval
+            return None
 
     def filelineno(self):
         return 'File "%s", line %s' % (self.path, self.lineno)
 
 
+# maps the path of each file directives were used in to a tuple of
+# itself, so that all code info objects for a file share the same
+# path object, and the module spec it was last seen with
+code_paths = {}
+
+
 def create_code_info(frame):
     """Return code information about a frame.
 
+    The lines of the file are taken from :mod:`linecache` and shared
+    with all other code info objects for the same file. The first time
+    a file is seen, and again whenever its module is executed anew, as
+    a reload does, the cache is checked for changes to the file.
+
     Returns a :class:`CodeInfo` instance.
     """
-    frameinfo = inspect.getframeinfo(frame)
-
-    try:
-        sourceline = frameinfo.code_context[0].strip()
-    except:
-        # if no source file exists, e.g., due to eval
-        sourceline = frameinfo.code_context
-
+    path = frame.f_code.co_filename
+    # a reload sets a new spec on the module
+    spec = frame.f_globals.get('__spec__')
+    entry = code_paths.get(path)
+    if entry is None or entry[1] is not spec:
+        shared_path = path if entry is None else entry[0]
+        code_paths[path] = shared_path, spec
+        linecache.checkcache(path)
+    else:
+        shared_path = entry[0]
     return CodeInfo(
-        path=frameinfo.filename,
-        lineno=frameinfo.lineno,
-        sourceline=sourceline)
+        path=shared_path,
+        lineno=frame.f_lineno,
+        sourceline=None,
+        lines=linecache.getlines(shared_path, frame.f_globals),
+        module=frame.f_globals.get('__name__'))
 
 
 def factory_key(item):
@@ -944,6 +1362,36 @@ def factory_key(item):
     return arguments.items()
 
 
+def create_config(action_class, config, factory, app_class):
+    """Create a configuration object using its factory.
+
+    :param action_class: the :class:`dectate.Action` subclass this factory
+      needs to build a registry for.
+    :param config: the ``config`` attribute to get the configuration items
+      the factory needs from.
+    :param factory: the factory for the object that is going to be
+      constructed.
+    :param app_class: the application class that the object constructed
+      is stored in.
+    :return: the object constructed.
+    """
+    return factory(**get_factory_arguments(action_class, config, factory,
+                                           app_class))
+
+
+def delete_config_item(config, name):
+    """Delete a configuration object, or its factory if not created yet.
+
+    :param config: the ``config`` attribute to delete the item from.
+    :param name: the name of the item.
+    """
+    if name in config.__dict__:
+        delattr(config, name)
+    factories = config.__dict__.get('_factories')
+    if factories is not None:
+        factories.pop(name, None)
+
+
 def get_factory_arguments(action_class, config, factory, app_class):
     """Get arguments needed to construct factory.
 
@@ -0,0 +1,241 @@
+"""Offline index of committed configuration.
+
+The index is a SQLite database that contains the actions of committed
+apps, with their filter values and where in the source code they were
+registered. It can be queried without importing the project the apps
+are defined in.
+
+The index also lists the directives of each app and the names their
+actions can be filtered on, which is what shell completion for
+``decq`` uses.
+"""
+import os
+import sqlite3
+from .config import dotted_name
+from .error import QueryError
+from .query import Query, expand_action_classes
+from .tool import Attributes, filter_names, value_text
+
+FORMAT_VERSION = 2
+
+SCHEMA = """
+CREATE TABLE meta (format_version INTEGER);
+CREATE TABLE app (id INTEGER PRIMARY KEY, name TEXT, repr TEXT);
+CREATE TABLE action (
+  id INTEGER PRIMARY KEY, app INTEGER, directive TEXT,
+  path TEXT, lineno INTEGER, sourceline TEXT);
+CREATE TABLE attribute (action INTEGER, name TEXT, value TEXT);
+CREATE TABLE directive (app INTEGER, name TEXT);
+CREATE TABLE filter (app INTEGER, directive TEXT, name TEXT);
+CREATE INDEX action_directive ON action (directive, app);
+CREATE INDEX attribute_value ON attribute (name, value, action);
+"""
+
+
+class IndexFileError(Exception):
+    pass
+
+
+def write_index(path, app_classes):
+    """Write an index for committed app classes.
+
+    For each directive on the app classes, the actions a query for it
+    returns are written to the index. Any existing file at ``path`` is
+    replaced.
+
+    :param path: the path of the index file to write.
+    :param app_classes: an iterable of committed :class:`App` subclasses.
+    """
+    tmp_path = path + '.tmp'
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    db = sqlite3.connect(tmp_path)
+    try:
+        db.executescript(SCHEMA)
+        db.execute("INSERT INTO meta VALUES (?)", (FORMAT_VERSION,))
+        for app_class in app_classes:
+            write_app(db, app_class)
+        db.commit()
+    finally:
+        db.close()
+    os.rename(tmp_path, path)
+
+
+def write_app(db, app_class):
+    app_id = db.execute(
+        "INSERT INTO app (name, repr) VALUES (?, ?)",
+        (dotted_name(app_class), repr(app_class))).lastrowid
+    attributes = Attributes()
+    for name, method in sorted(app_class.get_directive_methods()):
+        db.execute("INSERT INTO directive VALUES (?, ?)", (app_id, name))
+        action_factory = method.__func__.action_factory
+        try:
+            action_classes = expand_action_classes([action_factory])
+            results = list(Query(action_factory)(app_class))
+        except QueryError:
+            continue  # a composite without query_classes
+        names = set()
+        for action_class in action_classes:
+            names.update(filter_names(action_class))
+        for action, obj in results:
+            code_info = action.code_info
+            if code_info is None:
+                location = None, None, None
+            else:
+                location = (code_info.path, code_info.lineno,
+                            code_info.sourceline)
+            action_id = db.execute(
+                "INSERT INTO action (app, directive, path, lineno, "
+                "sourceline) VALUES (?, ?, ?, ?, ?)",
+                (app_id, name) + location).lastrowid
+            values = list(attributes(action))
+            db.executemany(
+                "INSERT INTO attribute VALUES (?, ?, ?)",
+                [(action_id, attribute_name, value_text(value))
+                 for attribute_name, value in values])
+            names.update(attribute_name for attribute_name, value in values)
+        db.executemany(
+            "INSERT INTO filter VALUES (?, ?, ?)",
+            [(app_id, name, filter_name) for filter_name in sorted(names)])
+
+
+def query_index(path, directive, filters, app_names=None):
+    """Query an index.
+
+    Filter values are compared with the text form of the values in the
+    index, so :attr:`Action.filter_convert` and
+    :attr:`Action.filter_compare` are not taken into account.
+
+    :param path: the path of the index file.
+    :param directive: name of directive to query.
+    :param filters: dict with raw filter values.
+    :param app_names: a list of dotted names of apps to query. By default
+      all apps in the index are queried.
+    :return: iterable of output lines, like :func:`query_tool_output`.
+    """
+    db = open_index(path)
+    try:
+        for app_id, app_repr in get_apps(db, app_names):
+            sql = ("SELECT id, path, lineno, sourceline FROM action "
+                   "WHERE directive = ? AND app = ?")
+            parameters = [directive, app_id]
+            for name, value in sorted(filters.items()):
+                sql += (" AND id IN (SELECT action FROM attribute "
+                        "WHERE name = ? AND value = ?)")
+                parameters.extend([name, value])
+            sql += " ORDER BY id"
+            rows = db.execute(sql, parameters).fetchall()
+            if not rows:
+                continue
+            yield "App: %s" % app_repr
+            for action_id, path, lineno, sourceline in rows:
+                if path is None:
+                    # not created by a directive, like format_text
+                    yield "  %s %s" % (directive, ' '.join(
+                        '%s=%s' % item for item in db.execute(
+                            "SELECT name, value FROM attribute "
+                            "WHERE action = ? ORDER BY name",
+                            [action_id])))
+                    yield ""
+                    continue
+                yield '  File "%s", line %s' % (path, lineno)
+                yield "  %s" % sourceline
+                yield ""
+    finally:
+        db.close()
+
+
+def open_index(path):
+    """Open an index file and check its format.
+
+    :param path: the path of the index file.
+    :return: a :class:`sqlite3.Connection`.
+    """
+    if not os.path.exists(path):
+        raise IndexFileError("Index file does not exist: %s" % path)
+    db = sqlite3.connect(path)
+    try:
+        version, = db.execute("SELECT format_version FROM meta").fetchone()
+    except sqlite3.DatabaseError:
+        db.close()
+        raise IndexFileError("Not an index file: %s" % path)
+    if version != FORMAT_VERSION:
+        db.close()
+        raise IndexFileError("Unsupported index format: %s" % version)
+    return db
+
+
+def indexed_apps(db):
+    """Dotted names of the apps in an index.
+
+    :param db: a connection returned by :func:`open_index`.
+    :return: a sorted list of names.
+    """
+    return names(db, "SELECT name FROM app", [])
+
+
+def indexed_directives(db, app_names=None):
+    """Names of the directives of apps in an index.
+
+    :param db: a connection returned by :func:`open_index`.
+    :param app_names: a list of dotted names of apps. By default the
+      directives of all apps in the index are given.
+    :return: a sorted list of names.
+    """
+    sql, parameters = app_ids(app_names)
+    return names(db, "SELECT name FROM directive WHERE app IN (%s)" % sql,
+                 parameters)
+
+
+def indexed_filters(db, directive, app_names=None):
+    """Names the actions of a directive can be filtered on.
+
+    :param db: a connection returned by :func:`open_index`.
+    :param directive: name of the directive.
+    :param app_names: a list of dotted names of apps. By default all
+      apps in the index are used.
+    :return: a sorted list of names.
+    """
+    sql, parameters = app_ids(app_names)
+    return names(db, "SELECT name FROM filter WHERE directive = ? "
+                 "AND app IN (%s)" % sql, [directive] + parameters)
+
+
+def indexed_values(db, directive, name, app_names=None):
+    """Text form of the filter values of the actions of a directive.
+
+    :param db: a connection returned by :func:`open_index`.
+    :param directive: name of the directive.
+    :param name: name of the filter.
+    :param app_names: a list of dotted names of apps. By default all
+      apps in the index are used.
+    :return: a sorted list of values.
+    """
+    sql, parameters = app_ids(app_names)
+    return names(db, "SELECT value FROM attribute WHERE name = ? "
+                 "AND action IN (SELECT id FROM action WHERE directive = ? "
+                 "AND app IN (%s))" % sql, [name, directive] + parameters)
+
+
+def app_ids(app_names):
+    if app_names is None:
+        return "SELECT id FROM app", []
+    return ("SELECT id FROM app WHERE name IN (%s)" %
+            ', '.join('?' * len(app_names)), list(app_names))
+
+
+def names(db, sql, parameters):
+    return sorted(set(row[0] for row in db.execute(sql, parameters)))
+
+
+def get_apps(db, app_names):
+    if app_names is None:
+        return db.execute("SELECT id, repr FROM app ORDER BY id").fetchall()
+    result = []
+    for name in app_names:
+        row = db.execute("SELECT id, repr FROM app WHERE name = ?",
+                         (name,)).fetchone()
+        if row is None:
+            raise IndexFileError("App not in index: %s" % name)
+        result.append(row)
+    return result
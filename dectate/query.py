@@ -1,6 +1,11 @@
-from .config import Composite
+import time
+from collections import namedtuple
+from itertools import chain
+from operator import itemgetter
+from .config import Action, Composite
 from .error import QueryError
 from .compat import string_types
+from .sentinel import NOT_FOUND
 
 
 class Callable(object):
@@ -15,6 +20,113 @@ class Callable(object):
         """
         return self.execute(app_class.dectate)
 
+    def introspect(self, app_class):
+        """Execute the query against an app class without committing it.
+
+        The actions are created from the directives registered on the
+        app class, but no configuration is set up and no actions are
+        performed. See :class:`dectate.config.Introspection` for the
+        limitations of this.
+
+        :param app_class: a :class:`App` subclass to execute the query
+          against. It does not need to be committed.
+        :return: iterable of results, like when the query is called.
+        """
+        return self.execute(app_class.dectate.introspect())
+
+    def aiter(self, app_class, chunk_size=100, time_budget=None):
+        """Execute the query as an asynchronous iterator.
+
+        This lets you query in an :mod:`asyncio` based service without
+        blocking the event loop for the duration of a large query::
+
+          async for action, obj in query.aiter(MyApp):
+              ...
+
+        The results are produced in chunks; between chunks control is
+        given back to the event loop. Only available on Python 3.5
+        and later.
+
+        :param app_class: a :class:`App` subclass to execute the query
+          against.
+        :param chunk_size: the maximum amount of results in a chunk.
+        :param time_budget: if given, the maximum amount of seconds
+          spent on a chunk. This is checked each time a result is
+          produced.
+        :return: asynchronous iterable of results, like when the query
+          is called.
+        """
+        return AsyncResults(self(app_class), chunk_size, time_budget)
+
+
+if hasattr(time, 'monotonic'):
+    clock = time.monotonic
+else:
+    clock = time.time
+
+
+class AsyncResults(object):
+    """Asynchronous iterator over query results.
+
+    This is implemented without ``async`` syntax so that this module
+    can still be imported on older versions of Python.
+    """
+    def __init__(self, results, chunk_size, time_budget):
+        self.results = iter(results)
+        self.chunk_size = chunk_size
+        self.time_budget = time_budget
+        self.chunk_count = 0
+        self.chunk_start = None
+
+    def __aiter__(self):
+        return self
+
+    def __anext__(self):
+        return NextResult(self)
+
+    def release(self):
+        """True if control should be given back to the event loop.
+
+        If so, a new chunk is started.
+        """
+        if self.chunk_start is None:
+            self.chunk_start = clock()
+            return False
+        if (self.chunk_count < self.chunk_size and
+            (self.time_budget is None or
+             clock() - self.chunk_start < self.time_budget)):
+            return False
+        self.chunk_count = 0
+        self.chunk_start = None
+        return True
+
+
+class NextResult(object):
+    """Awaitable that produces the next result of :class:`AsyncResults`.
+
+    Its iterator yields ``None`` to give control back to the event loop
+    and then raises ``StopIteration`` with the result.
+    """
+    def __init__(self, results):
+        self.results = results
+
+    def __await__(self):
+        return self
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        results = self.results
+        if results.release():
+            return None
+        for result in results.results:
+            results.chunk_count += 1
+            raise StopIteration(result)
+        raise StopAsyncIteration
+
+    next = __next__
+
 
 class Base(Callable):
     def filter(self, **kw):
@@ -50,6 +162,80 @@ class Base(Callable):
         """
         return Attrs(self, names)
 
+    def tuples(self, *names):
+        """Extract attributes from resulting actions as named tuples.
+
+        Like :meth:`Query.attrs`, but each result is a named tuple
+        with a field for each name, in the order given. The named
+        tuple class is generated once for the query, and the way to
+        get each attribute is determined once per action class, which
+        makes this cheaper than :meth:`Query.attrs` for large results.
+
+        Obeys :attr:`Action.filter_name` and
+        :attr:`Action.filter_get_value`.
+
+        Names that a named tuple cannot have as field name, such as
+        names that start with an underscore, are still attributes of
+        the rows, but their fields are named by position, like with the
+        ``rename`` argument of :func:`collections.namedtuple`.
+
+        :param: ``*names``: list of names to extract.
+        :return: iterable of named tuples.
+        """
+        return Tuples(self, names)
+
+    def join(self, other, on):
+        """Join the results of this query with those of another query.
+
+        Results are paired up when the value for ``on`` of the action
+        in this query equals the value for ``on`` of the action in the
+        other query. Obeys :attr:`Action.filter_name` and
+        :attr:`Action.filter_get_value`. Results without a value for
+        ``on`` are never paired up.
+
+        Both queries are executed against the same app class. A hash
+        table is built of the results of the query with the fewest
+        results, and the results of the other query are streamed
+        against it; the results come in the order of the latter.
+        Values that cannot be hashed, such as lists, are looked up by
+        comparing them with each such value in the table instead.
+
+        :param other: the query to join with.
+        :param on: the name to join on. Can also be a tuple of a name
+          in this query and a name in the other query.
+        :return: iterable of ``((action, obj), (other_action, other_obj))``.
+        """
+        return Join(self, other, on)
+
+    def group_by(self, name):
+        """Group results by the value for a name.
+
+        Obeys :attr:`Action.filter_name` and
+        :attr:`Action.filter_get_value`. Results without a value for
+        ``name`` are grouped under :data:`NOT_FOUND`.
+
+        The results are grouped in a single pass. Use
+        :meth:`GroupBy.count` to only count the results in each group.
+
+        :param name: the name to group by.
+        :return: iterable of ``value, results`` tuples in the order in
+          which the values are first seen, where ``results`` is a list
+          of ``(action, obj)``.
+        """
+        return GroupBy(self, name)
+
+    def distinct(self, name):
+        """Get the distinct values for a name in the results.
+
+        Obeys :attr:`Action.filter_name` and
+        :attr:`Action.filter_get_value`.
+
+        :param name: the name to get the values for.
+        :return: iterable of values in the order in which they are first
+          seen.
+        """
+        return Distinct(self, name)
+
     def obj(self):
         """Get objects from results.
 
@@ -64,7 +250,8 @@ class Query(Base):
     """An object representing a query.
 
     A query can be chained with :meth:`Query.filter`, :meth:`Query.attrs`,
-    :meth:`Query.obj`.
+    :meth:`Query.tuples`, :meth:`Query.join`, :meth:`Query.group_by`,
+    :meth:`Query.distinct`, :meth:`Query.obj`.
 
     :param: ``*action_classes``: one or more action classes to query for.
       Can be instances of :class:`Action` or :class:`Composite`. Can
@@ -110,6 +297,11 @@ def query_action_classes(configurable, action_classes):
         if action_group is None:
             raise QueryError("%r is not an action of %r" %
                              (action_class, configurable.app_class))
+        only = getattr(configurable, '_only', None)
+        if only is not None and action_class not in only:
+            raise QueryError(
+                "%r was committed without the actions of %r" %
+                (configurable.app_class, action_class))
         for action, obj in action_group.get_actions():
             yield action, obj
 
@@ -147,17 +339,244 @@ class Filter(Base):
                 yield action, obj
 
 
+def get_function(f):
+    # in Python 2 we get unbound methods from the class
+    return getattr(f, '__func__', f)
+
+
+def value_getter(action_class, name):
+    """Get a function that gets the filter value from an action.
+
+    The function takes an action instance of ``action_class`` and
+    returns the same value as :meth:`Action.get_value_for_filter`
+    would for ``name``, but :attr:`Action.filter_name` and
+    :meth:`Action.filter_get_value` are looked up only once.
+
+    :param action_class: the :class:`Action` subclass.
+    :param name: the filter name to get the value for.
+    :return: a function that takes an action and returns a value.
+    """
+    if (get_function(action_class.get_value_for_filter) is not
+            get_function(Action.get_value_for_filter)):
+        # custom implementation, so we cannot take any shortcuts
+        return lambda action: action.get_value_for_filter(name)
+    actual_name = action_class.filter_name.get(name, name)
+    if action_class.filter_get_value is None:
+        return lambda action: getattr(action, actual_name, NOT_FOUND)
+
+    def get(action):
+        value = getattr(action, actual_name, NOT_FOUND)
+        if value is not NOT_FOUND:
+            return value
+        return action.filter_get_value(name)
+    return get
+
+
+def get_values(results, names):
+    """Get values for names from query results.
+
+    :param results: iterable of ``(action, obj)``.
+    :param names: the filter names to get values for.
+    :return: iterable of ``(action, obj), values``, where ``values``
+      is a tuple with a value for each name.
+    """
+    getters_by_class = {}
+    for action, obj in results:
+        action_class = action.__class__
+        getters = getters_by_class.get(action_class)
+        if getters is None:
+            getters = getters_by_class[action_class] = [
+                value_getter(action_class, name) for name in names]
+        yield (action, obj), tuple([get(action) for get in getters])
+
+
 class Attrs(Callable):
     def __init__(self, query, names):
         self.query = query
         self.names = names
 
     def execute(self, configurable):
-        for action, obj in self.query.execute(configurable):
-            attrs = {}
-            for name in self.names:
-                attrs[name] = action.get_value_for_filter(name)
-            yield attrs
+        names = self.names
+        for result, values in get_values(
+                self.query.execute(configurable), names):
+            yield dict(zip(names, values))
+
+
+class Tuples(Callable):
+    def __init__(self, query, names):
+        self.query = query
+        self.names = names
+        self.row_class = row_class(names)
+
+    def execute(self, configurable):
+        make = self.row_class._make
+        for result, values in get_values(
+                self.query.execute(configurable), self.names):
+            yield make(values)
+
+
+def row_class(names):
+    """Create a named tuple class with a field for each name.
+
+    :param names: the names of the fields.
+    :return: a :func:`collections.namedtuple` class. Names that are
+      renamed to their position because they cannot be field names are
+      added as properties.
+    """
+    result = namedtuple('Row', names, rename=True)
+    renamed = dict(
+        (name, property(itemgetter(i)))
+        for i, (name, field) in enumerate(zip(names, result._fields))
+        if name != field)
+    if not renamed:
+        return result
+    renamed['__slots__'] = ()
+    return type('Row', (result,), renamed)
+
+
+class Join(Callable):
+    def __init__(self, query, other, on):
+        self.query = query
+        self.other = other
+        if isinstance(on, string_types):
+            on = on, on
+        self.name, self.other_name = on
+
+    def execute(self, configurable):
+        left = iter(self.query.execute(configurable))
+        right = iter(self.other.execute(configurable))
+        left_seen = []
+        right_seen = []
+        # consume both sides in turn until one is exhausted; that one
+        # is the smallest, so we build the hash table for it
+        while True:
+            for result in left:
+                left_seen.append(result)
+                break
+            else:
+                table = build_table(left_seen, self.name)
+                for result, key in get_keys(chain(right_seen, right),
+                                            self.other_name):
+                    for match in table.get(key, ()):
+                        yield match, result
+                return
+            for result in right:
+                right_seen.append(result)
+                break
+            else:
+                table = build_table(right_seen, self.other_name)
+                for result, key in get_keys(chain(left_seen, left),
+                                            self.name):
+                    for match in table.get(key, ()):
+                        yield result, match
+                return
+
+
+class GroupBy(Callable):
+    def __init__(self, query, name):
+        self.query = query
+        self.name = name
+
+    def count(self):
+        """Count the results in each group.
+
+        :return: iterable of ``value, count`` tuples in the order in
+          which the values are first seen.
+        """
+        return Count(self.query, self.name)
+
+    def execute(self, configurable):
+        groups = ValueTable()
+        values = []
+        for result, (value,) in get_values(
+                self.query.execute(configurable), [self.name]):
+            group = groups.get(value)
+            if group is None:
+                group = groups.setdefault(value, [])
+                values.append(value)
+            group.append(result)
+        for value in values:
+            yield value, groups.get(value)
+
+
+class Count(Callable):
+    def __init__(self, query, name):
+        self.query = query
+        self.name = name
+
+    def execute(self, configurable):
+        # maps values to their index in values and counts
+        indexes = ValueTable()
+        values = []
+        counts = []
+        for result, (value,) in get_values(
+                self.query.execute(configurable), [self.name]):
+            index = indexes.get(value)
+            if index is None:
+                index = indexes.setdefault(value, len(values))
+                values.append(value)
+                counts.append(0)
+            counts[index] += 1
+        for value, count in zip(values, counts):
+            yield value, count
+
+
+class Distinct(Callable):
+    def __init__(self, query, name):
+        self.query = query
+        self.name = name
+
+    def execute(self, configurable):
+        seen = ValueTable()
+        for result, (value,) in get_values(
+                self.query.execute(configurable), [self.name]):
+            if seen.get(value) is None:
+                seen.setdefault(value, True)
+                yield value
+
+
+def get_keys(results, name):
+    for result, (key,) in get_values(results, [name]):
+        if key is not NOT_FOUND:
+            yield result, key
+
+
+def build_table(results, name):
+    table = ValueTable()
+    for result, key in get_keys(results, name):
+        table.setdefault(key, []).append(result)
+    return table
+
+
+class ValueTable(object):
+    """Maps filter values to items.
+
+    Like a dict, but values that cannot be hashed, such as lists, can
+    be used as keys too. These are compared by equality, like
+    :meth:`Query.filter` does, which means a linear search.
+    """
+    def __init__(self):
+        self._hashed = {}
+        self._unhashed = []
+
+    def get(self, key, default=None):
+        try:
+            return self._hashed.get(key, default)
+        except TypeError:
+            for other, item in self._unhashed:
+                if other == key:
+                    return item
+            return default
+
+    def setdefault(self, key, default):
+        try:
+            return self._hashed.setdefault(key, default)
+        except TypeError:
+            for other, item in self._unhashed:
+                if other == key:
+                    return item
+            self._unhashed.append((key, default))
+            return default
 
 
 class Obj(Callable):
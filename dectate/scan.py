@@ -0,0 +1,101 @@
+"""Import all modules in a package, so their directives are registered.
+"""
+import importlib
+import pkgutil
+from multiprocessing.pool import ThreadPool
+from .app import all_app_classes
+from .compat import string_types
+from .config import registration_lock
+
+
+def scan(package, workers=1, ignore=None):
+    """Import all modules in a package.
+
+    Directives are registered when the modules that use them are
+    imported. This imports the package and its modules and
+    subpackages recursively, so you cannot forget to import one.
+
+    With more than one worker, the modules of each package are imported
+    concurrently in that many threads.
+
+    Whatever the amount of workers, directives registered while
+    scanning are then put in the order of the name of the module they
+    were used in, keeping the order within each module. This way their
+    actions are performed in the same order whatever order the modules
+    happened to be imported in. Note that this order can differ from
+    the one you get by importing the modules yourself, even with a
+    single worker.
+
+    :param package: a package, or the dotted name of a package.
+    :param workers: the amount of threads to import modules in.
+    :param ignore: a list of dotted names of modules and packages not
+      to import. Names that start with ``.`` are relative to
+      ``package``.
+    """
+    if isinstance(package, string_types):
+        package = importlib.import_module(package)
+    ignore = [package.__name__ + name if name.startswith('.') else name
+              for name in (ignore or [])]
+    lengths = directive_counts()
+    pool = ThreadPool(workers) if workers > 1 else None
+    try:
+        packages = [package]
+        while packages:
+            names = [name for name in submodule_names(packages)
+                     if not is_ignored(name, ignore)]
+            if pool is None:
+                modules = [importlib.import_module(name) for name in names]
+            else:
+                modules = pool.map(importlib.import_module, names)
+            packages = [module for module in modules
+                        if hasattr(module, '__path__')]
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    sort_new_directives(lengths)
+
+
+def submodule_names(packages):
+    result = []
+    for package in packages:
+        for module_info in pkgutil.iter_modules(package.__path__):
+            result.append(package.__name__ + '.' + module_info[1])
+    return result
+
+
+def is_ignored(name, ignore):
+    for ignored in ignore:
+        if name == ignored or name.startswith(ignored + '.'):
+            return True
+    return False
+
+
+def directive_counts():
+    """Get how many directives are registered on each app class.
+
+    :return: a dict with configurable keys and amount values.
+    """
+    return dict((app_class.dectate, len(app_class.dectate._directives))
+                for app_class in all_app_classes()
+                if not app_class.dectate.frozen)
+
+
+def sort_new_directives(counts):
+    """Sort directives registered since counting by module name.
+
+    The sort is stable, so directives used in the same module stay in
+    the order in which they were registered.
+
+    :param counts: as returned by :func:`directive_counts`.
+    """
+    with registration_lock:
+        for app_class in all_app_classes():
+            configurable = app_class.dectate
+            if configurable.frozen:
+                continue
+            count = counts.get(configurable, 0)
+            directives = configurable._directives
+            directives[count:] = sorted(
+                directives[count:],
+                key=lambda item: item[0].code_info.module or '')
@@ -0,0 +1,124 @@
+import json
+import os
+import sys
+import stat
+from .compat import socketserver, text_type
+from .tool import (ToolError, HelpRequested, QueryArgumentParser,
+                   make_parser, query_lines, source_paths)
+
+
+class QueryHandler(socketserver.StreamRequestHandler):
+    """Answer a single query.
+
+    The request is a line with a JSON object with an ``argv`` key that
+    contains the command-line arguments for the query, as you would
+    give them to ``decq``.
+
+    The response consists of lines with JSON objects. There is a
+    ``{"line": ...}`` object for each line of output, followed by a
+    ``{"status": 0}`` object. If the query fails the response ends with
+    a ``{"status": 2, "error": ...}`` object instead. If the arguments
+    ask for help, the lines are those of the help text.
+    """
+    def handle(self):
+        try:
+            request = json.loads(self.rfile.readline().decode('utf-8'))
+            argv = request['argv']
+        except (ValueError, KeyError, TypeError):
+            self.send({'status': 2, 'error': "Cannot parse request."})
+            return
+        try:
+            args, filters = self.server.parser.parse_known_args(argv)
+            if args.directive is None:
+                raise ToolError(
+                    "the following arguments are required: directive")
+            lines = list(query_lines(self.server.app_classes, args, filters))
+        except HelpRequested as e:
+            lines = e.help.splitlines()
+        except ToolError as e:
+            self.send({'status': 2, 'error': text_type(e)})
+            return
+        for line in lines:
+            self.send({'line': line})
+        self.send({'status': 0})
+
+    def send(self, message):
+        self.wfile.write((json.dumps(message) + '\n').encode('utf-8'))
+
+
+class QueryServer(socketserver.UnixStreamServer):
+    """Server that answers queries on a Unix socket.
+
+    The app classes are imported and committed once, so that each query
+    only costs the query itself. See :class:`QueryHandler` for the
+    protocol; :func:`dectate.client.send_query` implements the client
+    side.
+    """
+    timeout = 1.0
+
+    def __init__(self, path, app_classes, defaults=None):
+        """
+        :param path: the path of the Unix socket to listen on. If a
+          socket already exists there it is removed.
+        :param app_classes: the :class:`App` subclasses to query if
+          ``--app`` is not given.
+        :param defaults: a dict with values for the options that queries
+          don't give, as returned by :func:`dectate.tool.query_defaults`.
+        """
+        if os.path.exists(path) and stat.S_ISSOCK(os.stat(path).st_mode):
+            os.remove(path)
+        socketserver.UnixStreamServer.__init__(self, path, QueryHandler)
+        self.path = path
+        self.app_classes = app_classes
+        self.parser = make_parser(QueryArgumentParser)
+        if defaults:
+            self.parser.set_defaults(**defaults)
+
+    def run(self, reload=False):
+        """Handle requests until the process is stopped.
+
+        Without ``reload`` this is :meth:`serve_forever`, so
+        :meth:`shutdown` stops it.
+
+        :param reload: if true, the process restarts itself when one of
+          the source files of the configuration changes, so that the
+          apps are imported and committed again.
+        """
+        if not reload:
+            self.serve_forever()
+            return
+        mtimes = get_mtimes(source_paths(self.app_classes))
+        while not files_changed(mtimes):
+            self.handle_request()
+        self.server_close()
+        os.execv(sys.executable, [sys.executable] + sys.argv)
+
+    def server_close(self):
+        socketserver.UnixStreamServer.server_close(self)
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def get_mtimes(paths):
+    """Get modification times of files.
+
+    :param paths: an iterable of paths.
+    :return: a dict with paths as keys and modification times as values.
+      Files that do not exist have ``None`` as modification time.
+    """
+    result = {}
+    for path in paths:
+        try:
+            result[path] = os.stat(path).st_mtime
+        except OSError:
+            result[path] = None
+    return result
+
+
+def files_changed(mtimes):
+    """Check whether files changed since their modification times were got.
+
+    :param mtimes: as returned by :func:`get_mtimes`.
+    :return: ``True`` if any file was changed, created or removed.
+    """
+    return get_mtimes(mtimes.keys()) != mtimes
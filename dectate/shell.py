@@ -0,0 +1,205 @@
+"""Interactive shell for ``decq``.
+
+The shell imports and commits the apps once, and then answers queries
+until it is left, so each query only pays for executing the query.
+"""
+from __future__ import print_function
+
+import argparse
+import cmd
+import shlex
+from .compat import text_type
+from .error import QueryError
+from .tool import (ToolError, HelpRequested, QueryArgumentParser, FORMATS,
+                   make_parser, query_lines, build_query, parse_directive,
+                   parse_app_class, parse_filters, value_text)
+
+
+class QueryShell(cmd.Cmd):
+    """Shell that answers ``decq`` queries.
+
+    A line that is not a command is a query, with the arguments you
+    would give to ``decq``::
+
+      decq> foo name=alpha
+      decq> --app=myproject.App --format=json foo
+
+    :param app_classes: the :class:`App` subclasses to query if no
+      other apps are selected with the ``app`` command.
+    :param stdin: file to read commands from instead of the terminal.
+    :param stdout: file to write output to.
+    """
+    intro = "Type a query as you would give it to decq, or help."
+    prompt = 'decq> '
+
+    def __init__(self, app_classes, stdin=None, stdout=None):
+        cmd.Cmd.__init__(self, stdin=stdin, stdout=stdout)
+        if stdin is not None:
+            self.use_rawinput = False
+        self.default_app_classes = list(app_classes)
+        self.app_classes = self.default_app_classes
+        self.format = 'text'
+        self.parser = make_parser(QueryArgumentParser)
+        self.parser.set_defaults(format=None)
+
+    def output(self, lines):
+        for line in lines:
+            print(line, file=self.stdout)
+
+    def onecmd(self, line):
+        try:
+            return cmd.Cmd.onecmd(self, line)
+        except HelpRequested as e:
+            # help on the query arguments, such as for -h
+            print(e.help, file=self.stdout)
+        except (ToolError, QueryError, ValueError) as e:
+            print("Error: %s" % e, file=self.stdout)
+
+    def emptyline(self):
+        pass
+
+    def default(self, line):
+        args, filters = self.parser.parse_known_args(shlex.split(line))
+        if args.directive is None:
+            raise ToolError("the following arguments are required: directive")
+        if args.format is None:
+            args.format = self.format
+        self.output(query_lines(self.app_classes, args, filters))
+
+    def do_app(self, arg):
+        """app [APP...]: show or select the apps to query.
+
+        APP is the dotted name of an App subclass. Use "app -" to
+        select the apps the shell was started with again.
+        """
+        names = shlex.split(arg)
+        if names == ['-']:
+            self.app_classes = self.default_app_classes
+        elif names:
+            try:
+                self.app_classes = [parse_app_class(name) for name in names]
+            except argparse.ArgumentTypeError as e:
+                raise ToolError(text_type(e))
+        else:
+            self.output(repr(app_class) for app_class in self.app_classes)
+
+    def do_format(self, arg):
+        """format [FORMAT]: show or select the output format of queries.
+
+        FORMAT is one of text, json, ndjson and csv.
+        """
+        arg = arg.strip()
+        if not arg:
+            self.output([self.format])
+        elif arg in FORMATS:
+            self.format = arg
+        else:
+            raise ToolError("Unknown format: %s" % arg)
+
+    def do_count(self, arg):
+        """count QUERY [by NAME]: count query results.
+
+        A QUERY is a DIRECTIVE followed by FILTERs. Counts the results
+        per app, or with "by NAME" the results for each value for NAME.
+        Results without a value for NAME are counted as <NOT_FOUND>.
+        """
+        words = shlex.split(arg)
+        name = None
+        if len(words) > 2 and words[-2] == 'by':
+            name = words[-1]
+            words = words[:-2]
+        if not words:
+            raise ToolError("the following arguments are required: directive")
+        directive, filters = words[0], parse_filters(words[1:])
+        self.output(count_lines(self.committed_app_classes(), directive,
+                                filters, name))
+
+    def do_join(self, arg):
+        """join QUERY with QUERY on NAME: pair up query results.
+
+        A QUERY is a DIRECTIVE followed by FILTERs. Results of the two
+        queries are paired up if they have the same value for NAME.
+        """
+        words = shlex.split(arg)
+        if (len(words) < 5 or words[-2] != 'on' or
+                'with' not in words[1:-3]):
+            raise ToolError(
+                "usage: join DIRECTIVE [FILTER...] with DIRECTIVE "
+                "[FILTER...] on NAME")
+        i = words.index('with', 1)
+        left = words[0], parse_filters(words[1:i])
+        right = words[i + 1], parse_filters(words[i + 2:-2])
+        self.output(join_lines(self.committed_app_classes(), left, right,
+                               words[-1]))
+
+    def do_quit(self, arg):
+        """quit: leave the shell."""
+        return True
+
+    def do_EOF(self, arg):
+        print(file=self.stdout)
+        return True
+
+    def committed_app_classes(self):
+        for app_class in self.app_classes:
+            if not app_class.is_committed():
+                raise ToolError("App %r was not committed." % app_class)
+        return self.app_classes
+
+
+def count_lines(app_classes, directive, filters, name=None):
+    """Output lines for counting the results of a query.
+
+    :param app_classes: the committed :class:`App` subclasses to query.
+    :param directive: name of directive to query.
+    :param filters: dict with raw filter values.
+    :param name: the name to count the results for each value of, or
+      ``None`` to count all results.
+    :return: iterable of lines.
+    """
+    for app_class in app_classes:
+        if parse_directive(app_class, directive) is None:
+            continue
+        query = build_query(app_class, directive, filters)
+        yield "App: %r" % app_class
+        if name is None:
+            yield "  %s" % sum(1 for result in query(app_class))
+            continue
+        for value, count in query.group_by(name).count()(app_class):
+            yield "  %s: %s" % (value_text(value), count)
+
+
+def join_lines(app_classes, left, right, name):
+    """Output lines for joining the results of two queries.
+
+    :param app_classes: the committed :class:`App` subclasses to query.
+    :param left: ``directive, filters`` tuple of the first query.
+    :param right: ``directive, filters`` tuple of the second query.
+    :param name: the name to join on.
+    :return: iterable of lines.
+    """
+    for app_class in app_classes:
+        if (parse_directive(app_class, left[0]) is None or
+                parse_directive(app_class, right[0]) is None):
+            continue
+        query = build_query(app_class, *left).join(
+            build_query(app_class, *right), name)
+        first = True
+        for (action, obj), (other_action, other_obj) in query(app_class):
+            if first:
+                yield "App: %r" % app_class
+                first = False
+            for line in location_lines(action):
+                yield line
+            for line in location_lines(other_action):
+                yield "  " + line
+            yield ""
+
+
+def location_lines(action):
+    code_info = action.code_info
+    if code_info is None:
+        yield "  %r" % action
+        return
+    yield '  File "%s", line %s' % (code_info.path, code_info.lineno)
+    yield "  %s" % code_info.sourceline
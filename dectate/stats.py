@@ -0,0 +1,169 @@
+"""Statistics about the configuration of committed apps.
+"""
+import sys
+import types
+from .config import Composite, dotted_name
+from .error import ConfigError
+
+
+def app_stats(app_class):
+    """Get statistics about a committed app class.
+
+    Frozen apps no longer have what is needed to compute these.
+
+    :param app_class: a committed :class:`App` subclass that is not
+      frozen.
+    :return: a dict with the dotted name of the ``app``, the
+      ``commit_duration`` of its last commit in seconds and a list of
+      ``groups`` with a dict of statistics for each action group, as
+      returned by :func:`group_stats`.
+    """
+    configurable = app_class.dectate
+    if configurable.frozen:
+        raise ConfigError(
+            "Cannot get statistics of frozen app: %r" % app_class)
+    return {
+        'app': dotted_name(app_class),
+        'commit_duration': configurable.commit_duration,
+        'groups': [
+            group_stats(configurable, action_group)
+            for action_class, action_group in sorted(
+                configurable._action_groups.items(),
+                key=lambda item: dotted_name(item[0]))]
+    }
+
+
+def group_stats(configurable, action_group):
+    """Get statistics about an action group of a committed configurable.
+
+    :param configurable: the :class:`dectate.config.Configurable`.
+    :param action_group: the :class:`dectate.config.ActionGroup`.
+    :return: a dict with:
+
+      ``action_class``
+        the dotted name of the action class of the group.
+
+      ``directives``
+        the amount of directives used with this configurable that
+        resulted in actions in this group.
+
+      ``actions``
+        the amount of actions these directives expanded to.
+
+      ``inherited``
+        the amount of actions inherited from configurables extended.
+
+      ``overridden``
+        the amount of actions that override an inherited action.
+
+      ``composites``
+        the amount of composite directives among ``directives``.
+
+      ``composite_actions``
+        the amount of actions these composite directives expanded to.
+
+      ``config_size``
+        an estimate of the size in bytes of the config objects of the
+        group. Objects shared by several groups count for each, and
+        objects not created yet do not count.
+    """
+    own = set(id(action) for action, obj in action_group._actions)
+    directives = set()
+    composites = set()
+    composite_actions = 0
+    for action, obj in action_group._actions:
+        directive = action.directive
+        if directive is None:
+            continue
+        directives.add(directive)
+        if issubclass(directive.action_factory, Composite):
+            composites.add(directive)
+            composite_actions += 1
+    inherited = 0
+    overridden = 0
+    for key, (action, obj) in action_group._action_map.items():
+        if id(action) not in own:
+            inherited += 1
+        elif any(key in extend._action_map for extend in action_group.extends):
+            overridden += 1
+    config = configurable.config
+    return {
+        'action_class': dotted_name(action_group.action_class),
+        'directives': len(directives),
+        'actions': len(action_group._actions),
+        'inherited': inherited,
+        'overridden': overridden,
+        'composites': len(composites),
+        'composite_actions': composite_actions,
+        'config_size': deep_sizeof(tuple(
+            config.__dict__.get(name)
+            for name in action_group.action_class.config)),
+    }
+
+
+# objects that are code or shared by everything rather than configuration
+OPAQUE_TYPES = (type, types.FunctionType, types.BuiltinFunctionType,
+                types.MethodType, types.ModuleType)
+
+
+def deep_sizeof(obj):
+    """Estimate the size of an object and the objects it refers to.
+
+    Follows the contents of dicts, lists, tuples, sets, and the
+    ``__dict__`` and ``__slots__`` of instances. Classes, functions,
+    methods and modules are counted but not followed. Each object is
+    counted once.
+
+    :param obj: the object to estimate the size of.
+    :return: the size in bytes.
+    """
+    seen = set()
+    size = 0
+    stack = [obj]
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        size += sys.getsizeof(obj)
+        if isinstance(obj, OPAQUE_TYPES):
+            continue
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+        d = getattr(obj, '__dict__', None)
+        if isinstance(d, dict):
+            stack.append(d)
+        slots = getattr(type(obj), '__slots__', ())
+        if isinstance(slots, str):
+            slots = (slots,)
+        for name in slots:
+            value = getattr(obj, name, None)
+            if value is not None:
+                stack.append(value)
+    return size
+
+
+def format_stats(app_classes):
+    """Format statistics for app classes as a table.
+
+    :param app_classes: an iterable of committed :class:`App` subclasses.
+    :return: iterable of lines.
+    """
+    columns = ['directives', 'actions', 'inherited', 'overridden',
+               'composites', 'composite_actions', 'config_size']
+    for app_class in app_classes:
+        stats = app_stats(app_class)
+        yield "App: %s (commit: %.3fs)" % (stats['app'],
+                                           stats['commit_duration'] or 0)
+        width = max([len(group['action_class'])
+                     for group in stats['groups']] + [len('action_class')])
+        yield '  %s  %s' % ('action_class'.ljust(width), '  '.join(columns))
+        for group in stats['groups']:
+            yield '  %s  %s' % (
+                group['action_class'].ljust(width),
+                '  '.join(str(group[column]).rjust(len(column))
+                          for column in columns))
+        yield ''
@@ -1,6 +1,7 @@
 from dectate.app import App, directive
 from dectate.config import commit, Action, Composite
-from dectate.error import ConflictError, ConfigError
+from dectate.error import ConflictError, ConfigError, QueryError
+from dectate.query import Query
 
 import pytest
 
@@ -1896,3 +1897,670 @@ def test_app_class_cleanup():
     commit(MyApp)
 
     assert MyApp.touched == [None]
+
+
+def test_directive_compact():
+    class MyDirective(Action):
+        def __init__(self, message, **kw):
+            self.message = message
+
+        def identifier(self):
+            return self.message
+
+        def perform(self, obj):
+            pass
+
+    class MyApp(App):
+        foo = directive(MyDirective)
+
+    class SubApp(MyApp):
+        pass
+
+    @SubApp.foo('hello', extra=1)
+    def f():
+        pass
+
+    (d, obj), = SubApp.dectate._directives
+    assert d.configurable is SubApp.dectate
+    assert d.argument_info == (('hello',), {'extra': 1})
+    assert not hasattr(d, '__dict__')
+    assert not hasattr(d.code_info, '__dict__')
+    commit(SubApp)
+    assert not hasattr(SubApp.dectate.get_action_group(MyDirective),
+                       '__dict__')
+
+
+def test_config_created_on_access():
+    created = []
+
+    class Registry(object):
+        def __init__(self):
+            created.append('registry')
+
+    class Other(object):
+        factory_arguments = {
+            'registry': Registry
+        }
+
+        def __init__(self, registry):
+            created.append('other')
+            self.registry = registry
+
+    class FooDirective(Action):
+        config = {
+            'registry': Registry
+        }
+
+        def __init__(self, message):
+            self.message = message
+
+        def identifier(self, registry):
+            return self.message
+
+        def perform(self, obj, registry):
+            pass
+
+    class BarDirective(Action):
+        config = {
+            'other': Other
+        }
+
+        def __init__(self, name):
+            self.name = name
+
+        def identifier(self, other):
+            return self.name
+
+        def perform(self, obj, other):
+            pass
+
+    class MyApp(App):
+        foo = directive(FooDirective)
+        bar = directive(BarDirective)
+
+    commit(MyApp)
+
+    # nothing to perform, so nothing is created
+    assert created == []
+
+    other = MyApp.config.other
+    assert created == ['registry', 'other']
+    assert other.registry is MyApp.config.registry
+    assert MyApp.config.other is other
+    assert created == ['registry', 'other']
+
+    with pytest.raises(AttributeError):
+        MyApp.config.unknown
+
+    @MyApp.foo('hello')
+    def f():
+        pass
+
+    commit(MyApp)
+
+    assert created == ['registry', 'other', 'registry']
+    assert MyApp.config.other is not other
+    assert created == ['registry', 'other', 'registry', 'other']
+
+
+def test_config_empty_group_before():
+    class FooDirective(Action):
+        config = {
+            'my': list
+        }
+
+        def __init__(self, message):
+            self.message = message
+
+        def identifier(self, my):
+            return self.message
+
+        def perform(self, obj, my):
+            pass
+
+        @staticmethod
+        def before(my):
+            my.append('before')
+
+    class MyApp(App):
+        foo = directive(FooDirective)
+
+    commit(MyApp)
+
+    assert MyApp.config.__dict__['my'] == ['before']
+
+
+def test_config_created_once_in_threads():
+    import threading
+    created = []
+
+    def factory():
+        created.append(None)
+        return object()
+
+    class FooDirective(Action):
+        config = {
+            'registry': factory
+        }
+
+        def __init__(self, message):
+            self.message = message
+
+        def identifier(self, registry):
+            return self.message
+
+        def perform(self, obj, registry):
+            pass
+
+    class MyApp(App):
+        foo = directive(FooDirective)
+
+    commit(MyApp)
+
+    results = []
+
+    def access():
+        results.append(MyApp.config.registry)
+
+    threads = [threading.Thread(target=access) for i in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(created) == 1
+    assert len(set(id(result) for result in results)) == 1
+
+
+def test_config_access_in_threads_no_attribute_error():
+    import sys
+    import threading
+
+    class FooDirective(Action):
+        config = {
+            'registry': list
+        }
+
+        def __init__(self, message):
+            self.message = message
+
+        def identifier(self, registry):
+            return self.message
+
+        def perform(self, obj, registry):
+            pass
+
+    class MyApp(App):
+        foo = directive(FooDirective)
+
+    errors = []
+
+    def access(start):
+        start.wait()
+        try:
+            MyApp.config.registry
+        except AttributeError as e:
+            errors.append(e)
+
+    # switch threads as often as possible to make races show up
+    if hasattr(sys, 'setswitchinterval'):
+        interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+    else:
+        interval = sys.getcheckinterval()
+        sys.setcheckinterval(1)
+    try:
+        for i in range(200):
+            commit(MyApp)
+            start = threading.Event()
+            threads = [threading.Thread(target=access, args=(start,))
+                       for i in range(8)]
+            for thread in threads:
+                thread.start()
+            start.set()
+            for thread in threads:
+                thread.join()
+    finally:
+        if hasattr(sys, 'setswitchinterval'):
+            sys.setswitchinterval(interval)
+        else:
+            sys.setcheckinterval(interval)
+
+    assert errors == []
+
+
+def test_commit_only():
+    performed = []
+
+    class FooDirective(Action):
+        config = {
+            'foos': list
+        }
+
+        def __init__(self, message):
+            self.message = message
+
+        def identifier(self, foos):
+            return self.message
+
+        def perform(self, obj, foos):
+            performed.append(('foo', self.message))
+            foos.append(self.message)
+
+    class BarDirective(Action):
+        config = {
+            'bars': list
+        }
+
+        depends = [FooDirective]
+
+        def __init__(self, message):
+            self.message = message
+
+        def identifier(self, bars):
+            return self.message
+
+        def perform(self, obj, bars):
+            performed.append(('bar', self.message))
+
+    class QuxDirective(Action):
+        def __init__(self, message):
+            self.message = message
+
+        def identifier(self):
+            return self.message
+
+        def perform(self, obj):
+            performed.append(('qux', self.message))
+
+    class FoosDirective(Composite):
+        query_classes = [FooDirective]
+
+        def __init__(self, messages):
+            self.messages = messages
+
+        def actions(self, obj):
+            return [(FooDirective(message), obj)
+                    for message in self.messages]
+
+    class MyApp(App):
+        foo = directive(FooDirective)
+        bar = directive(BarDirective)
+        qux = directive(QuxDirective)
+        foos = directive(FoosDirective)
+
+    class SubApp(MyApp):
+        pass
+
+    @MyApp.foo('a')
+    def f():
+        pass
+
+    @MyApp.bar('b')
+    def g():
+        pass
+
+    @SubApp.qux('c')
+    def h():
+        pass
+
+    @SubApp.foos(['d', 'e'])
+    def i():
+        pass
+
+    commit(SubApp, only=['bar'])
+    assert performed == [('foo', 'a'), ('bar', 'b'),
+                         ('foo', 'a'), ('foo', 'd'), ('foo', 'e'),
+                         ('bar', 'b')]
+    assert SubApp.dectate.partial
+    assert SubApp.config.foos == ['a', 'd', 'e']
+    assert SubApp.dectate.get_action_group(QuxDirective).get_actions() == []
+    assert list(Query('bar')(SubApp))
+    with pytest.raises(QueryError):
+        list(Query('qux')(SubApp))
+
+    del performed[:]
+    commit(SubApp, only=[QuxDirective])
+    assert performed == [('qux', 'c')]
+    assert 'foos' not in SubApp.config.__dict__
+
+    del performed[:]
+    commit(SubApp, only=['foos'])
+    assert performed == [('foo', 'a'), ('foo', 'a'), ('foo', 'd'),
+                         ('foo', 'e')]
+
+    del performed[:]
+    commit(SubApp)
+    assert not SubApp.dectate.partial
+    assert len(performed) == 7
+
+
+def test_commit_only_committed_base():
+    class FooDirective(Action):
+        config = {
+            'foos': list
+        }
+
+        def __init__(self, message):
+            self.message = message
+
+        def identifier(self, foos):
+            return self.message
+
+        def perform(self, obj, foos):
+            foos.append(self.message)
+
+    class BarDirective(Action):
+        config = {
+            'bars': list
+        }
+
+        def __init__(self, message):
+            self.message = message
+
+        def identifier(self, bars):
+            return self.message
+
+        def perform(self, obj, bars):
+            bars.append(self.message)
+
+    class MyApp(App):
+        foo = directive(FooDirective)
+        bar = directive(BarDirective)
+
+    class SubApp(MyApp):
+        pass
+
+    @MyApp.foo('a')
+    def f():
+        pass
+
+    @MyApp.bar('b')
+    def g():
+        pass
+
+    commit(MyApp)
+    commit(SubApp, only=['foo'])
+    assert not MyApp.dectate.partial
+    assert MyApp.config.bars == ['b']
+    assert SubApp.dectate.partial
+    assert SubApp.config.foos == ['a']
+    assert SubApp.config.bars == []
+
+
+def test_commit_only_errors():
+    class FooDirective(Action):
+        def __init__(self, message):
+            self.message = message
+
+        def identifier(self):
+            return self.message
+
+        def perform(self, obj):
+            pass
+
+    class UnqueryableDirective(Composite):
+        def actions(self, obj):
+            return []
+
+    class MyApp(App):
+        foo = directive(FooDirective)
+        unqueryable = directive(UnqueryableDirective)
+
+    with pytest.raises(ConfigError):
+        commit(MyApp, only=['unknown'])
+
+    with pytest.raises(ConfigError):
+        commit(MyApp, only=['unqueryable'])
+
+    with pytest.raises(TypeError):
+        commit(MyApp, onl=['foo'])
+
+    assert not MyApp.is_committed()
+
+
+def test_commit_on_access():
+    performed = []
+
+    class MyDirective(Action):
+        config = {
+            'my': list
+        }
+
+        def __init__(self, message):
+            self.message = message
+
+        def identifier(self, my):
+            return self.message
+
+        def perform(self, obj, my):
+            performed.append(self.message)
+            my.append(self.message)
+
+    class BaseApp(App):
+        foo = directive(MyDirective)
+
+    class MyApp(BaseApp):
+        commit_on_access = True
+
+    class OtherApp(BaseApp):
+        commit_on_access = True
+
+    @BaseApp.foo('a')
+    def f():
+        pass
+
+    @MyApp.foo('b')
+    def g():
+        pass
+
+    assert not MyApp.is_committed()
+    assert MyApp.config.my == ['a', 'b']
+    assert MyApp.is_committed()
+    assert BaseApp.is_committed()
+    assert performed == ['a', 'a', 'b']
+
+    # the base is not committed again
+    assert OtherApp.config.my == ['a']
+    assert performed == ['a', 'a', 'b', 'a']
+
+    with pytest.raises(AttributeError):
+        MyApp.config.unknown
+
+    # not opted in
+    class PlainApp(BaseApp):
+        pass
+
+    with pytest.raises(AttributeError):
+        PlainApp.config.my
+    assert not PlainApp.is_committed()
+
+
+def test_commit_on_access_threads():
+    import threading
+    commits = []
+
+    class MyDirective(Action):
+        config = {
+            'my': list
+        }
+
+        def __init__(self, message):
+            self.message = message
+
+        def identifier(self, my):
+            return self.message
+
+        def perform(self, obj, my):
+            my.append(self.message)
+
+    class MyApp(App):
+        commit_on_access = True
+
+        foo = directive(MyDirective)
+
+        @classmethod
+        def clean(cls):
+            commits.append(None)
+
+    @MyApp.foo('a')
+    def f():
+        pass
+
+    results = []
+
+    def access():
+        results.append(MyApp.config.my)
+
+    threads = [threading.Thread(target=access) for i in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(commits) == 1
+    assert results == [['a']] * 10
+
+
+def test_commit_on_access_threads_slow_perform():
+    import threading
+    import time
+    started = threading.Event()
+
+    class MyDirective(Action):
+        config = {
+            'my': list
+        }
+
+        def __init__(self, message):
+            self.message = message
+
+        def identifier(self, my):
+            return self.message
+
+        def perform(self, obj, my):
+            started.set()
+            time.sleep(0.01)
+            my.append(self.message)
+
+    class MyApp(App):
+        commit_on_access = True
+
+        foo = directive(MyDirective)
+
+    for i in range(10):
+        MyApp.foo(i)(None)
+
+    config = MyApp.config
+    results = []
+
+    def access():
+        results.append(list(MyApp.config.my))
+
+    committer = threading.Thread(target=access)
+    committer.start()
+    started.wait()
+    # the commit is still performing actions
+    reader = threading.Thread(target=access)
+    reader.start()
+    committer.join()
+    reader.join()
+
+    assert results == [list(range(10))] * 2
+    assert MyApp.config is not config
+    # the old config object looks up configurations on the new one
+    assert config.my is MyApp.config.my
+
+
+def test_commit_snapshot():
+    seen = []
+
+    class MyDirective(Action):
+        config = {
+            'my': list
+        }
+
+        def __init__(self, message):
+            self.message = message
+
+        app_class_arg = True
+
+        def identifier(self, my, app_class):
+            return self.message
+
+        def perform(self, obj, my, app_class):
+            # what readers see while the commit is going on
+            seen.append(list(app_class.config.my))
+            my.append(self.message)
+
+    class MyApp(App):
+        foo = directive(MyDirective)
+
+    class SubApp(MyApp):
+        pass
+
+    @MyApp.foo('a')
+    def f():
+        pass
+
+    @SubApp.foo('b')
+    def g():
+        pass
+
+    commit(SubApp)
+    del seen[:]
+    commit(SubApp)
+    # the configuration is changed in place
+    assert seen == [[], [], ['a']]
+
+    old_config = MyApp.config
+    del seen[:]
+    commit(SubApp, snapshot=True)
+    # the previous configuration stayed complete during the commit
+    assert seen == [['a'], ['a', 'b'], ['a', 'b']]
+    assert MyApp.config is not old_config
+    assert MyApp.config is MyApp.dectate.config
+    assert old_config.my == ['a']
+    assert MyApp.config.my == ['a']
+    assert SubApp.config.my == ['a', 'b']
+    assert SubApp.config is SubApp.dectate.config
+    assert SubApp.dectate.get_action_group(MyDirective).get_actions()
+
+
+def test_commit_snapshot_failure():
+    class MyDirective(Action):
+        config = {
+            'my': list
+        }
+
+        def __init__(self, message):
+            self.message = message
+
+        def identifier(self, my):
+            return self.message
+
+        def perform(self, obj, my):
+            my.append(self.message)
+
+    class MyApp(App):
+        foo = directive(MyDirective)
+
+    @MyApp.foo('a')
+    def f():
+        pass
+
+    commit(MyApp)
+    old_config = MyApp.config
+    old_action_groups = MyApp.dectate._action_groups
+
+    @MyApp.foo('a')
+    def g():
+        pass
+
+    with pytest.raises(ConflictError):
+        commit(MyApp, snapshot=True)
+
+    assert MyApp.config is old_config
+    assert MyApp.dectate.config is old_config
+    assert MyApp.dectate._action_groups is old_action_groups
+    assert old_config.my == ['a']
@@ -0,0 +1,176 @@
+import gc
+import pytest
+
+from dectate.app import App, directive
+from dectate.config import commit, freeze, Action
+from dectate.error import ConfigError
+from dectate.query import Query
+from dectate.stats import app_stats
+from dectate.tool import source_paths
+
+
+class MyDirective(Action):
+    config = {
+        'my': list
+    }
+
+    def __init__(self, message):
+        self.message = message
+
+    def identifier(self, my):
+        return self.message
+
+    def perform(self, obj, my):
+        my.append((self.message, obj))
+
+
+def make_app():
+    class MyApp(App):
+        foo = directive(MyDirective)
+
+    @MyApp.foo('hello')
+    def f():
+        pass
+
+    return MyApp, f
+
+
+def test_freeze():
+    MyApp, f = make_app()
+    commit(MyApp)
+    freeze(MyApp)
+
+    assert MyApp.dectate.frozen
+    assert MyApp.dectate._directives is None
+    assert MyApp.dectate._action_groups is None
+    assert MyApp.config.my == [('hello', f)]
+    assert MyApp.is_committed()
+
+
+def test_freeze_refuses_changes():
+    MyApp, f = make_app()
+    commit(MyApp)
+    freeze(MyApp)
+
+    with pytest.raises(ConfigError):
+        @MyApp.foo('bye')
+        def g():
+            pass
+
+    with pytest.raises(ConfigError):
+        commit(MyApp)
+
+    with pytest.raises(ConfigError):
+        MyApp.commit()
+
+    with pytest.raises(ConfigError):
+        list(Query(MyDirective)(MyApp))
+
+    with pytest.raises(ConfigError):
+        list(Query(MyDirective).introspect(MyApp))
+
+    assert MyApp.config.my == [('hello', f)]
+
+
+@pytest.mark.parametrize('queries', [False, True])
+def test_freeze_tools(queries):
+    MyApp, f = make_app()
+    commit(MyApp)
+    freeze(MyApp, queries=queries)
+
+    with pytest.raises(ConfigError):
+        app_stats(MyApp)
+    assert source_paths([MyApp]) == {__file__}
+
+
+def test_freeze_uncommitted():
+    MyApp, f = make_app()
+    with pytest.raises(ConfigError):
+        freeze(MyApp)
+    assert not MyApp.dectate.frozen
+
+
+def test_freeze_unknown_keyword():
+    MyApp, f = make_app()
+    commit(MyApp)
+    with pytest.raises(TypeError):
+        freeze(MyApp, query=True)
+
+
+def test_freeze_queries():
+    MyApp, f = make_app()
+    commit(MyApp)
+    freeze(MyApp, queries=True)
+
+    assert MyApp.dectate._directives is None
+    action_group = MyApp.dectate.get_action_group(MyDirective)
+    assert action_group._actions is None
+    assert [action.message for action, obj in
+            Query(MyDirective)(MyApp)] == ['hello']
+
+    with pytest.raises(ConfigError):
+        commit(MyApp)
+
+
+def test_freeze_queries_extends():
+    MyApp, f = make_app()
+    commit(MyApp)
+    freeze(MyApp, queries=True)
+
+    class SubApp(MyApp):
+        pass
+
+    @SubApp.foo('bye')
+    def g():
+        pass
+
+    commit(SubApp)
+
+    assert SubApp.config.my == [('hello', f), ('bye', g)]
+    assert MyApp.config.my == [('hello', f)]
+
+
+def test_freeze_extends():
+    MyApp, f = make_app()
+    commit(MyApp)
+    freeze(MyApp)
+
+    class SubApp(MyApp):
+        pass
+
+    with pytest.raises(ConfigError):
+        commit(SubApp)
+
+
+def test_freeze_only_given_apps():
+    MyApp, f = make_app()
+
+    class SubApp(MyApp):
+        pass
+
+    commit(SubApp)
+    freeze(SubApp)
+
+    assert not MyApp.dectate.frozen
+
+    @MyApp.foo('bye')
+    def g():
+        pass
+
+    commit(MyApp)
+
+    assert MyApp.config.my == [('hello', f), ('bye', g)]
+    assert SubApp.config.my == [('hello', f)]
+
+
+def test_freeze_prefork(monkeypatch):
+    calls = []
+    monkeypatch.setattr(gc, 'collect', lambda: calls.append('collect'))
+    monkeypatch.setattr(gc, 'freeze', lambda: calls.append('freeze'),
+                        raising=False)
+    MyApp, f = make_app()
+    commit(MyApp)
+    freeze(MyApp)
+    assert calls == []
+    freeze(MyApp, prefork=True)
+    assert calls == ['collect', 'freeze']
@@ -1,5 +1,9 @@
+import os
 import sys
-from ..config import create_code_info
+import textwrap
+
+from ..compat import reload
+from ..config import create_code_info, CodeInfo
 
 
 def current_code_info():
@@ -9,10 +13,52 @@ def current_code_info():
 def test_create_code_info():
     x = current_code_info()
     assert x.path == __file__
-    assert x.lineno == 10
+    assert x.lineno == 14
     assert x.sourceline == 'x = current_code_info()'
 
     x = eval('current_code_info()')
     assert x.path == '<string>'
     assert x.lineno == 1
     assert x.sourceline is None
+
+
+def test_create_code_info_shared():
+    x = current_code_info()
+    y = current_code_info()
+    assert x.path is y.path
+    assert x._source is y._source
+    assert y.sourceline == 'y = current_code_info()'
+
+
+def test_code_info_sourceline():
+    x = CodeInfo('foo.py', 3, 'x = foo()')
+    assert x.sourceline == 'x = foo()'
+    assert x.filelineno() == 'File "foo.py", line 3'
+    assert CodeInfo('foo.py', 3, None).sourceline is None
+    assert CodeInfo('foo.py', 2, None, ['a\n', '  b\n']).sourceline == 'b'
+
+
+def test_create_code_info_reload(tmpdir):
+    path = tmpdir.join('codeinfomodule.py')
+    path.write(textwrap.dedent('''
+        from dectate.tests.test_helpers import current_code_info
+        x = current_code_info()
+        '''))
+    sys.path.insert(0, str(tmpdir))
+    try:
+        import codeinfomodule
+        assert codeinfomodule.x.sourceline == 'x = current_code_info()'
+        path.write(textwrap.dedent('''
+            from dectate.tests.test_helpers import current_code_info
+            y = 1
+            x = current_code_info()
+            '''))
+        # make sure the modification time differs from the previous one
+        mtime = path.mtime() + 1
+        os.utime(str(path), (mtime, mtime))
+        reload(codeinfomodule)
+        assert codeinfomodule.x.lineno == 4
+        assert codeinfomodule.x.sourceline == 'x = current_code_info()'
+    finally:
+        sys.path.remove(str(tmpdir))
+        sys.modules.pop('codeinfomodule', None)
@@ -0,0 +1,190 @@
+import pytest
+
+from dectate.config import Action, Composite, commit
+from dectate.app import App, directive
+from dectate.index import write_index, query_index, IndexFileError
+from dectate.client import index_query_lines
+from dectate.completion import complete
+from dectate.tool import query_tool_output, convert_dotted_name, ToolError
+from dectate.sentinel import NOT_FOUND
+
+
+class Model(object):
+    pass
+
+
+class ViewAction(Action):
+    filter_convert = {
+        'model': convert_dotted_name
+    }
+
+    def __init__(self, model, name, **kw):
+        self.model = model
+        self.name = name
+        self.kw = kw
+
+    def filter_get_value(self, name):
+        return self.kw.get(name, NOT_FOUND)
+
+    def identifier(self):
+        return self.model, self.name
+
+    def perform(self, obj):
+        pass
+
+
+class ViewsAction(Composite):
+    query_classes = [ViewAction]
+
+    def __init__(self, model, names):
+        self.model = model
+        self.names = names
+
+    def actions(self, obj):
+        return [(ViewAction(self.model, name), obj) for name in self.names]
+
+
+class UnqueryableAction(Composite):
+    def actions(self, obj):
+        return []
+
+
+class MyApp(App):
+    view = directive(ViewAction)
+    views = directive(ViewsAction)
+    unqueryable = directive(UnqueryableAction)
+
+
+class OtherApp(App):
+    view = directive(ViewAction)
+
+
+@MyApp.view(Model, 'edit', permission='admin')
+def f():
+    pass
+
+
+@MyApp.views(Model, ['a', 'b'])
+def g():
+    pass
+
+
+@OtherApp.view(Model, 'edit')
+def h():
+    pass
+
+
+@pytest.fixture(scope='module')
+def index(tmpdir_factory):
+    commit(MyApp, OtherApp)
+    path = str(tmpdir_factory.mktemp('index').join('decq.db'))
+    write_index(path, [MyApp, OtherApp])
+    return path
+
+
+def test_query_index_same_as_query_tool(index):
+    model = 'dectate.tests.test_index.Model'
+    for filters in [{}, {'name': 'edit'}, {'name': 'a'}, {'model': model},
+                    {'model': model, 'name': 'b'}, {'name': 'c'}]:
+        assert (list(query_index(index, 'view', filters)) ==
+                list(query_tool_output([MyApp, OtherApp], 'view', filters)))
+        assert (list(query_index(index, 'view', filters,
+                                 ['dectate.tests.test_index.OtherApp'])) ==
+                list(query_tool_output([OtherApp], 'view', filters)))
+
+
+def test_query_index_without_directive(tmpdir):
+    class FooAction(Action):
+        def __init__(self, name):
+            self.name = name
+
+        def identifier(self):
+            return self.name
+
+        def perform(self, obj):
+            pass
+
+    class FooApp(App):
+        foo = directive(FooAction)
+
+    @FooApp.foo('b')
+    def f():
+        pass
+
+    commit(FooApp)
+
+    # an action that was not created by a directive
+    action = FooAction('a')
+    action.order = 0
+    FooApp.dectate.get_action_group(FooAction)._action_map['a'] = (
+        action, None)
+
+    path = str(tmpdir.join('decq.db'))
+    write_index(path, [FooApp])
+    lines = list(query_index(path, 'foo', {}))
+    assert lines == list(query_tool_output([FooApp], 'foo', {}))
+    assert lines[1:3] == ['  foo name=a', '']
+
+
+def test_query_index_kw(index):
+    lines = list(query_index(index, 'view', {'permission': 'admin'}))
+    assert len(lines) == 4
+    assert lines[2] == "  @MyApp.view(Model, 'edit', permission='admin')"
+
+
+def test_query_index_unknown(index):
+    assert list(query_index(index, 'unknown', {})) == []
+    assert list(query_index(index, 'unqueryable', {})) == []
+    with pytest.raises(IndexFileError):
+        list(query_index(index, 'view', {}, ['dectate.tests.NotThere']))
+
+
+def test_query_index_not_an_index(tmpdir):
+    with pytest.raises(IndexFileError):
+        list(query_index(str(tmpdir.join('nothere.db')), 'view', {}))
+    path = tmpdir.join('other.db')
+    path.write('this is not a database')
+    with pytest.raises(IndexFileError):
+        list(query_index(str(path), 'view', {}))
+
+
+def test_index_query_lines(index):
+    lines = list(index_query_lines(
+        index, ['--app=dectate.tests.test_index.MyApp', 'view', 'name=a']))
+    assert len(lines) == 4
+    with pytest.raises(ToolError):
+        list(index_query_lines(index, []))
+
+
+def test_complete(index):
+    assert complete(index, 'decq ') == ['unqueryable ', 'view ', 'views ']
+    assert complete(index, 'decq vi') == ['view ', 'views ']
+    assert complete(index, 'decq view ') == ['model=', 'name=', 'permission=']
+    assert complete(index, 'decq view na') == ['name=']
+    assert complete(index, 'decq view name=') == ['a ', 'b ', 'edit ']
+    assert complete(index, 'decq view name=e') == ['edit ']
+    assert complete(index, 'decq views name=b ') == [
+        'model=', 'name=', 'permission=']
+    assert complete(index, 'decq unqueryable ') == []
+    assert complete(index, 'decq --for') == ['--format=']
+    assert complete(index, 'decq --format=j') == ['json ']
+    assert complete(index, 'decq --format ') == [
+        'csv ', 'json ', 'ndjson ', 'text ']
+    assert complete(index, 'decq "view') == []
+
+
+def test_complete_app(index):
+    assert complete(index, 'decq --app ') == [
+        'dectate.tests.test_index.MyApp ',
+        'dectate.tests.test_index.OtherApp ']
+    assert complete(index, 'decq --app=dectate.tests.test_index.O') == [
+        'dectate.tests.test_index.OtherApp ']
+    assert complete(
+        index, 'decq --app dectate.tests.test_index.OtherApp ') == ['view ']
+    assert complete(
+        index, 'decq --app=dectate.tests.test_index.OtherApp view ') == [
+            'model=', 'name=']
+    assert complete(
+        index,
+        'decq --app=dectate.tests.test_index.OtherApp view name=') == [
+            'edit ']
@@ -1,3 +1,4 @@
+import sys
 import pytest
 
 from dectate import (
@@ -804,3 +805,588 @@ def test_query_action_for_other_app():
 
     with pytest.raises(QueryError):
         list(q(MyApp))
+
+
+def test_query_tuples():
+    class FooAction(Action):
+        config = {
+            'registry': list
+        }
+
+        def __init__(self, name, value):
+            self.name = name
+            self.value = value
+
+        def identifier(self, registry):
+            return self.name
+
+        def perform(self, obj, registry):
+            registry.append((self.name, obj))
+
+    class MyApp(App):
+        foo = directive(FooAction)
+
+    @MyApp.foo('a', 1)
+    def f():
+        pass
+
+    @MyApp.foo('b', 2)
+    def g():
+        pass
+
+    commit(MyApp)
+
+    q = Query(FooAction).tuples('value', 'name')
+
+    result = list(q(MyApp))
+    assert result == [(1, 'a'), (2, 'b')]
+    assert result[0].name == 'a'
+    assert result[0].value == 1
+
+
+def test_query_tuples_filter_name_and_get_value():
+    class FooAction(Action):
+        filter_name = {
+            'name': '_name'
+        }
+
+        def filter_get_value(self, name):
+            return self.kw.get(name, NOT_FOUND)
+
+        def __init__(self, name, **kw):
+            self._name = name
+            self.kw = kw
+
+        def identifier(self):
+            return tuple(sorted(self.kw.items()))
+
+        def perform(self, obj):
+            pass
+
+    class MyApp(App):
+        foo = directive(FooAction)
+
+    @MyApp.foo(name='hello', x='a', y='b')
+    def f():
+        pass
+
+    @MyApp.foo(name='bye', x='a')
+    def g():
+        pass
+
+    commit(MyApp)
+
+    q = Query(FooAction).tuples('name', 'x', 'y')
+
+    assert list(q(MyApp)) == [('hello', 'a', 'b'), ('bye', 'a', NOT_FOUND)]
+
+
+def test_query_tuples_custom_get_value_for_filter():
+    class FooAction(Action):
+        def __init__(self, name):
+            self.name = name
+
+        def get_value_for_filter(self, name):
+            return self.name.upper()
+
+        def identifier(self):
+            return self.name
+
+        def perform(self, obj):
+            pass
+
+    class MyApp(App):
+        foo = directive(FooAction)
+
+    @MyApp.foo('a')
+    def f():
+        pass
+
+    commit(MyApp)
+
+    q = Query(FooAction).tuples('name')
+
+    assert list(q(MyApp)) == [('A',)]
+
+
+def test_query_tuples_underscore_names():
+    class FooAction(Action):
+        def __init__(self, name):
+            self._name = name
+            self.name = name
+
+        def identifier(self):
+            return self.name
+
+        def perform(self, obj):
+            pass
+
+    class MyApp(App):
+        foo = directive(FooAction)
+
+    @MyApp.foo('a')
+    def f():
+        pass
+
+    commit(MyApp)
+
+    q = Query(FooAction).tuples('_name', 'name')
+
+    [row] = q(MyApp)
+    assert row == ('a', 'a')
+    assert row._name == 'a'
+    assert row.name == 'a'
+    assert list(Query(FooAction).attrs('_name')(MyApp)) == [{'_name': 'a'}]
+
+
+def test_introspect():
+    class FooAction(Action):
+        config = {
+            'registry': list
+        }
+
+        def __init__(self, name):
+            self.name = name
+
+        def identifier(self, registry):
+            return self.name
+
+        def perform(self, obj, registry):
+            raise AssertionError("should not be performed")
+
+    class SubAction(FooAction):
+        pass
+
+    class CompositeAction(Composite):
+        query_classes = [FooAction]
+
+        def __init__(self, names):
+            self.names = names
+
+        def actions(self, obj):
+            return [(FooAction(name), obj) for name in self.names]
+
+    class MyApp(App):
+        foo = directive(FooAction)
+        composite = directive(CompositeAction)
+
+    class SubApp(MyApp):
+        pass
+
+    @MyApp.foo('a')
+    def f():
+        pass
+
+    @SubApp.composite(['b', 'c'])
+    def g():
+        pass
+
+    q = Query(FooAction).filter(name='b').attrs('name')
+
+    assert list(q.introspect(SubApp)) == [{'name': 'b'}]
+    assert list(Query('foo').attrs('name').introspect(SubApp)) == [
+        {'name': 'a'}, {'name': 'b'}, {'name': 'c'}]
+    assert list(Query('foo').attrs('name').introspect(MyApp)) == [
+        {'name': 'a'}]
+    assert not hasattr(MyApp.config, 'registry')
+
+    with pytest.raises(QueryError):
+        list(Query(SubAction).introspect(SubApp))
+
+
+def test_introspect_diamond():
+    class FooAction(Action):
+        config = {
+            'registry': list
+        }
+
+        def __init__(self, name):
+            self.name = name
+
+        def identifier(self, registry):
+            return self.name
+
+        def perform(self, obj, registry):
+            registry.append(self.name)
+
+    class BaseApp(App):
+        foo = directive(FooAction)
+
+    class AApp(BaseApp):
+        pass
+
+    class BApp(BaseApp):
+        pass
+
+    class CApp(AApp, BApp):
+        pass
+
+    @BaseApp.foo('x')
+    def f():
+        pass
+
+    @BApp.foo('y')
+    def g():
+        pass
+
+    q = Query(FooAction).attrs('name')
+
+    assert list(q.introspect(CApp)) == [{'name': 'x'}, {'name': 'y'}]
+
+    commit(CApp)
+
+    assert list(q(CApp)) == [{'name': 'x'}, {'name': 'y'}]
+
+
+def test_join():
+    class PathAction(Action):
+        config = {
+            'registry': list
+        }
+
+        def __init__(self, model, path):
+            self.model = model
+            self.path = path
+
+        def identifier(self, registry):
+            return self.model
+
+        def perform(self, obj, registry):
+            pass
+
+    class ViewAction(Action):
+        config = {
+            'registry': list
+        }
+
+        def __init__(self, model, name):
+            self.model = model
+            self.name = name
+
+        def identifier(self, registry):
+            return self.model, self.name
+
+        def perform(self, obj, registry):
+            pass
+
+    class MyApp(App):
+        path = directive(PathAction)
+        view = directive(ViewAction)
+
+    @MyApp.path('a', '/a')
+    def a_path():
+        pass
+
+    @MyApp.path('b', '/b')
+    def b_path():
+        pass
+
+    @MyApp.view('a', 'edit')
+    def a_edit():
+        pass
+
+    @MyApp.view('a', 'view')
+    def a_view():
+        pass
+
+    @MyApp.view('c', 'view')
+    def c_view():
+        pass
+
+    commit(MyApp)
+
+    def names(results):
+        return [(left[0].name, right[0].path) for left, right in results]
+
+    q = Query(ViewAction).join(Query(PathAction), on='model')
+    assert names(q(MyApp)) == [('edit', '/a'), ('view', '/a')]
+
+    q = Query(PathAction).join(Query(ViewAction), on='model')
+    assert [(left[1], right[1]) for left, right in q(MyApp)] == [
+        (a_path, a_edit), (a_path, a_view)]
+
+    q = Query(ViewAction).filter(name='view').join(
+        Query(PathAction), on='model')
+    assert names(q(MyApp)) == [('view', '/a')]
+
+    q = Query(ViewAction).join(Query(PathAction), on=('model', 'unknown'))
+    assert list(q(MyApp)) == []
+
+
+def test_join_filter_name():
+    class FooAction(Action):
+        filter_name = {
+            'model': '_model'
+        }
+
+        def __init__(self, model):
+            self._model = model
+
+        def identifier(self):
+            return self._model
+
+        def perform(self, obj):
+            pass
+
+    class BarAction(Action):
+        def __init__(self, model):
+            self.model = model
+
+        def identifier(self):
+            return self.model
+
+        def perform(self, obj):
+            pass
+
+    class MyApp(App):
+        foo = directive(FooAction)
+        bar = directive(BarAction)
+
+    @MyApp.foo('a')
+    def f():
+        pass
+
+    @MyApp.bar('a')
+    def g():
+        pass
+
+    @MyApp.bar('b')
+    def h():
+        pass
+
+    commit(MyApp)
+
+    q = Query('foo').join(Query('bar'), on='model')
+    assert [(left[1], right[1]) for left, right in q(MyApp)] == [(f, g)]
+
+
+def test_group_by():
+    class FooAction(Action):
+        def __init__(self, model, name):
+            self.model = model
+            self.name = name
+
+        def identifier(self):
+            return self.model, self.name
+
+        def perform(self, obj):
+            pass
+
+    class MyApp(App):
+        foo = directive(FooAction)
+
+    @MyApp.foo('b', 'x')
+    def f():
+        pass
+
+    @MyApp.foo('a', 'x')
+    def g():
+        pass
+
+    @MyApp.foo('b', 'y')
+    def h():
+        pass
+
+    commit(MyApp)
+
+    q = Query(FooAction).group_by('model')
+    assert [(value, [obj for action, obj in results])
+            for value, results in q(MyApp)] == [('b', [f, h]), ('a', [g])]
+
+    q = Query(FooAction).group_by('model').count()
+    assert list(q(MyApp)) == [('b', 2), ('a', 1)]
+
+    q = Query(FooAction).filter(name='x').group_by('model').count()
+    assert list(q(MyApp)) == [('b', 1), ('a', 1)]
+
+    q = Query(FooAction).group_by('unknown').count()
+    assert list(q(MyApp)) == [(NOT_FOUND, 3)]
+
+
+def test_distinct():
+    class FooAction(Action):
+        def __init__(self, model, name):
+            self.model = model
+            self.name = name
+
+        def identifier(self):
+            return self.model, self.name
+
+        def perform(self, obj):
+            pass
+
+    class MyApp(App):
+        foo = directive(FooAction)
+
+    @MyApp.foo('b', 'x')
+    def f():
+        pass
+
+    @MyApp.foo('a', 'x')
+    def g():
+        pass
+
+    @MyApp.foo('b', 'y')
+    def h():
+        pass
+
+    commit(MyApp)
+
+    assert list(Query(FooAction).distinct('model')(MyApp)) == ['b', 'a']
+    assert list(Query(FooAction).distinct('name')(MyApp)) == ['x', 'y']
+
+
+def test_unhashable_values():
+    class FooAction(Action):
+        def __init__(self, models, name):
+            self.models = models
+            self.name = name
+
+        def identifier(self):
+            return self.name
+
+        def perform(self, obj):
+            pass
+
+    class BarAction(Action):
+        def __init__(self, models):
+            self.models = models
+
+        def identifier(self):
+            return tuple(self.models)
+
+        def perform(self, obj):
+            pass
+
+    class MyApp(App):
+        foo = directive(FooAction)
+        bar = directive(BarAction)
+
+    @MyApp.foo(['a', 'b'], 'x')
+    def f():
+        pass
+
+    @MyApp.foo(['c'], 'y')
+    def g():
+        pass
+
+    @MyApp.foo(['a', 'b'], 'z')
+    def h():
+        pass
+
+    @MyApp.bar(['a', 'b'])
+    def i():
+        pass
+
+    commit(MyApp)
+
+    assert [obj for action, obj in
+            Query(FooAction).filter(models=['a', 'b'])(MyApp)] == [f, h]
+
+    q = Query(FooAction).group_by('models')
+    assert [(value, [obj for action, obj in results])
+            for value, results in q(MyApp)] == [
+                (['a', 'b'], [f, h]), (['c'], [g])]
+
+    q = Query(FooAction).group_by('models').count()
+    assert list(q(MyApp)) == [(['a', 'b'], 2), (['c'], 1)]
+
+    q = Query(FooAction).distinct('models')
+    assert list(q(MyApp)) == [['a', 'b'], ['c']]
+
+    q = Query(FooAction).join(Query(BarAction), 'models')
+    assert [(foo[1], bar[1]) for foo, bar in q(MyApp)] == [(f, i), (h, i)]
+
+
+@pytest.mark.skipif(sys.version_info < (3, 5),
+                    reason="requires asyncio with async iteration")
+def test_aiter():
+    import asyncio
+
+    class FooAction(Action):
+        def __init__(self, name):
+            self.name = name
+
+        def identifier(self):
+            return self.name
+
+        def perform(self, obj):
+            pass
+
+    class MyApp(App):
+        foo = directive(FooAction)
+
+    for name in 'abcde':
+        MyApp.foo(name)(None)
+
+    commit(MyApp)
+
+    results = Query(FooAction).attrs('name').aiter(MyApp, chunk_size=2)
+
+    # drive the awaitables by hand to see where the loop is released
+    steps = []
+    while True:
+        awaitable = iter(results.__anext__().__await__())
+        try:
+            while True:
+                assert next(awaitable) is None
+                steps.append('release')
+        except StopIteration as e:
+            steps.append(e.args[0]['name'])
+        except StopAsyncIteration:
+            break
+    assert steps == ['a', 'b', 'release', 'c', 'd', 'release', 'e']
+
+    # and run them in an event loop
+    loop = asyncio.new_event_loop()
+    try:
+        results = Query(FooAction).attrs('name').aiter(
+            MyApp, chunk_size=2, time_budget=60)
+        names = []
+        while True:
+            try:
+                names.append(
+                    loop.run_until_complete(results.__anext__())['name'])
+            except StopAsyncIteration:
+                break
+    finally:
+        loop.close()
+    assert names == ['a', 'b', 'c', 'd', 'e']
+
+
+@pytest.mark.skipif(sys.version_info < (3, 5),
+                    reason="requires asyncio with async iteration")
+def test_aiter_time_budget():
+    class FooAction(Action):
+        def __init__(self, name):
+            self.name = name
+
+        def identifier(self):
+            return self.name
+
+        def perform(self, obj):
+            pass
+
+    class MyApp(App):
+        foo = directive(FooAction)
+
+    for name in 'abc':
+        MyApp.foo(name)(None)
+
+    commit(MyApp)
+
+    results = Query(FooAction).aiter(MyApp, time_budget=0)
+
+    steps = []
+    while True:
+        awaitable = iter(results.__anext__().__await__())
+        try:
+            while True:
+                assert next(awaitable) is None
+                steps.append('release')
+        except StopIteration:
+            steps.append('result')
+        except StopAsyncIteration:
+            break
+    assert steps == ['result', 'release', 'result', 'release', 'result',
+                     'release']
@@ -0,0 +1,140 @@
+import sys
+import textwrap
+import threading
+
+import pytest
+
+import dectate
+from dectate.app import App
+from dectate.config import Action
+from dectate.query import Query
+
+
+BASE = '''
+import dectate
+
+
+class FooAction(dectate.Action):
+    def __init__(self, name):
+        self.name = name
+
+    def identifier(self):
+        return self.name
+
+    def perform(self, obj):
+        pass
+
+
+class ScanApp(dectate.App):
+    foo = dectate.directive(FooAction)
+'''
+
+VIEWS = '''
+import time
+
+from {package}.base import ScanApp
+
+time.sleep({delay})
+
+
+@ScanApp.foo({first!r})
+def f():
+    pass
+
+
+@ScanApp.foo({second!r})
+def g():
+    pass
+'''
+
+
+@pytest.fixture
+def package(tmpdir):
+    name = 'scanpackage%s' % id(tmpdir)
+    root = tmpdir.mkdir(name)
+    root.join('__init__.py').write('')
+    root.join('base.py').write(textwrap.dedent(BASE))
+    # later modules are imported faster, so threads register them first
+    for i, letter in enumerate('abcdef'):
+        root.join('views_%s.py' % letter).write(VIEWS.format(
+            package=name, delay=0.05 * (6 - i),
+            first=letter + '1', second=letter + '0'))
+    sub = root.mkdir('sub')
+    sub.join('__init__.py').write('')
+    sub.join('more.py').write(VIEWS.format(
+        package=name, delay=0, first='z1', second='z0'))
+    tests = root.mkdir('tests')
+    tests.join('__init__.py').write('raise ImportError("ignored")')
+    sys.path.insert(0, str(tmpdir))
+    sys.dont_write_bytecode = True
+    try:
+        yield name
+    finally:
+        sys.dont_write_bytecode = False
+        sys.path.remove(str(tmpdir))
+        for module_name in list(sys.modules):
+            if module_name.startswith(name):
+                del sys.modules[module_name]
+
+
+def names(package):
+    app_class = sys.modules[package + '.base'].ScanApp
+    app_class.commit()
+    return [attrs['name'] for attrs in Query('foo').attrs('name')(app_class)]
+
+
+EXPECTED = ['z1', 'z0', 'a1', 'a0', 'b1', 'b0', 'c1', 'c0', 'd1', 'd0',
+            'e1', 'e0', 'f1', 'f0']
+
+
+def test_scan(package):
+    dectate.scan(package, ignore=['.tests'])
+    assert names(package) == EXPECTED
+    assert package + '.sub.more' in sys.modules
+
+
+@pytest.mark.parametrize('workers', [1, 4])
+def test_scan_order(package, workers):
+    dectate.scan(__import__(package), workers=workers, ignore=['.tests'])
+    assert names(package) == EXPECTED
+
+
+def test_scan_ignore_absolute(package):
+    dectate.scan(package, ignore=[package + '.tests', package + '.sub'])
+    assert package + '.sub.more' not in sys.modules
+
+
+def test_scan_import_error(package):
+    with pytest.raises(ImportError):
+        dectate.scan(package, workers=2)
+
+
+def test_register_directive_threads():
+    class MyAction(Action):
+        def __init__(self, name):
+            self.name = name
+
+        def identifier(self):
+            return self.name
+
+        def perform(self, obj):
+            pass
+
+    class MyApp(App):
+        foo = dectate.directive(MyAction)
+
+    def register(offset):
+        for i in range(200):
+            MyApp.foo(offset + i)(None)
+
+    threads = [threading.Thread(target=register, args=(i * 1000,))
+               for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(MyApp.dectate._directives) == 800
+    MyApp.commit()
+    orders = [action.order for action, obj in
+              MyApp.dectate.get_action_group(MyAction)._actions]
+    assert len(set(orders)) == 800
@@ -0,0 +1,173 @@
+import json
+import os
+import socket
+import sys
+import threading
+
+import pytest
+
+from dectate.config import Action, commit
+from dectate.app import App, directive
+from dectate.client import send_query, ClientError
+
+pytestmark = pytest.mark.skipif(not hasattr(socket, 'AF_UNIX'),
+                                reason="requires Unix sockets")
+
+
+class FooAction(Action):
+    def __init__(self, name):
+        self.name = name
+
+    def identifier(self):
+        return self.name
+
+    def perform(self, obj):
+        pass
+
+
+@pytest.fixture
+def server(tmpdir):
+    from dectate.server import QueryServer
+
+    class MyApp(App):
+        foo = directive(FooAction)
+
+    @MyApp.foo('a')
+    def f():
+        pass
+
+    @MyApp.foo('b')
+    def g():
+        pass
+
+    commit(MyApp)
+
+    server = QueryServer(str(tmpdir.join('decq.sock')), [MyApp])
+    yield server
+    server.server_close()
+
+
+def query(server, argv):
+    thread = threading.Thread(target=server.handle_request)
+    thread.start()
+    try:
+        return list(send_query(server.path, argv))
+    finally:
+        thread.join()
+
+
+def test_query(server):
+    lines = query(server, ['foo', 'name=a'])
+    assert len(lines) == 4
+    assert lines[0].startswith('App: ')
+    assert lines[2] == "  @MyApp.foo('a')"
+
+    assert len(query(server, ['foo'])) == 7
+    assert query(server, ['foo', 'name=c']) == []
+
+
+def test_query_error(server):
+    with pytest.raises(ClientError) as e:
+        query(server, ['foo', 'name'])
+    assert 'Cannot parse query filter' in str(e.value)
+
+    with pytest.raises(ClientError):
+        query(server, ['--app=dectate.tests.fixtures.nothere.AnApp', 'foo'])
+
+    with pytest.raises(ClientError):
+        query(server, [])
+
+
+def test_query_help(server):
+    lines = query(server, ['-h'])
+    assert lines[0].startswith('usage: ')
+    assert len(query(server, ['foo', 'name=a'])) == 4
+
+
+def test_replaces_stale_socket(server, tmpdir):
+    from dectate.server import QueryServer
+
+    path = server.path
+    server.socket.close()
+    other = QueryServer(path, server.app_classes)
+    try:
+        assert len(query(other, ['foo', 'name=a'])) == 4
+    finally:
+        other.server_close()
+    assert not os.path.exists(path)
+
+
+def test_defaults(server):
+    from dectate.server import QueryServer
+
+    path = server.path + '2'
+    other = QueryServer(path, server.app_classes, {
+        'format': 'ndjson', 'jobs': 1, 'uncommitted': False})
+    try:
+        lines = query(other, ['foo', 'name=a'])
+        assert len(lines) == 1
+        assert json.loads(lines[0])['attributes'] == {'name': 'a'}
+        assert query(other, ['--format=text', 'foo', 'name=a'])[0].startswith(
+            'App: ')
+    finally:
+        other.server_close()
+
+
+def test_no_server(tmpdir):
+    with pytest.raises(ClientError):
+        list(send_query(str(tmpdir.join('nothere.sock')), ['foo']))
+
+
+def test_get_mtimes(tmpdir):
+    from dectate.server import get_mtimes
+
+    path = tmpdir.join('a.py')
+    path.write('')
+    missing = str(tmpdir.join('b.py'))
+    mtimes = get_mtimes([str(path), missing])
+    assert mtimes[str(path)] == os.stat(str(path)).st_mtime
+    assert mtimes[missing] is None
+
+
+def test_files_changed(tmpdir):
+    from dectate.server import get_mtimes, files_changed
+
+    path = tmpdir.join('a.py')
+    path.write('')
+    missing = tmpdir.join('b.py')
+    mtimes = get_mtimes([str(path), str(missing)])
+    assert not files_changed(mtimes)
+
+    mtime = path.mtime() + 1
+    os.utime(str(path), (mtime, mtime))
+    assert files_changed(mtimes)
+
+    mtimes = get_mtimes([str(path), str(missing)])
+    missing.write('')
+    assert files_changed(mtimes)
+
+
+def test_run_shutdown(server):
+    thread = threading.Thread(target=server.run)
+    thread.start()
+    try:
+        assert len(list(send_query(server.path, ['foo', 'name=a']))) == 4
+    finally:
+        server.shutdown()
+        thread.join()
+
+
+def test_run_reload(server, monkeypatch):
+    from dectate import server as server_module
+
+    changes = iter([False, True])
+    monkeypatch.setattr(server_module, 'files_changed',
+                        lambda mtimes: next(changes))
+    execv = []
+    monkeypatch.setattr(os, 'execv', lambda *args: execv.append(args))
+    server.timeout = 0.01
+
+    server.run(reload=True)
+
+    assert execv == [(sys.executable, [sys.executable] + sys.argv)]
+    assert not os.path.exists(server.path)
@@ -0,0 +1,148 @@
+from dectate.app import App, directive
+from dectate.compat import StringIO
+from dectate.config import Action, commit
+from dectate.shell import QueryShell
+
+
+class FooAction(Action):
+    def __init__(self, name, kind=None):
+        self.name = name
+        self.kind = kind
+
+    def identifier(self):
+        return self.name
+
+    def perform(self, obj):
+        pass
+
+
+class BarAction(Action):
+    def __init__(self, name):
+        self.name = name
+
+    def identifier(self):
+        return self.name
+
+    def perform(self, obj):
+        pass
+
+
+class MyApp(App):
+    foo = directive(FooAction)
+    bar = directive(BarAction)
+
+
+class OtherApp(App):
+    foo = directive(FooAction)
+
+
+@MyApp.foo('a', kind='x')
+def f():
+    pass
+
+
+@MyApp.foo('b', kind='x')
+def g():
+    pass
+
+
+@MyApp.foo('c')
+def h():
+    pass
+
+
+@MyApp.bar('b')
+def i():
+    pass
+
+
+@OtherApp.foo('d')
+def j():
+    pass
+
+
+commit(MyApp, OtherApp)
+
+
+def run(*commands):
+    stdout = StringIO()
+    shell = QueryShell([MyApp, OtherApp], stdin=StringIO(
+        ''.join(command + '\n' for command in commands)), stdout=stdout)
+    shell.prompt = ''
+    shell.intro = ''
+    shell.cmdloop()
+    return stdout.getvalue().splitlines()
+
+
+def test_shell_query():
+    assert run('foo name=a') == [
+        "App: %r" % MyApp,
+        '  File "%s", line 39' % __file__.replace('.pyc', '.py'),
+        "  @MyApp.foo('a', kind='x')",
+        "",
+        ""]
+
+
+def test_shell_query_error():
+    assert run('foo name') == ["Error: Cannot parse query filter, no =.", ""]
+    assert run('--format=json') == [
+        "Error: the following arguments are required: directive", ""]
+    assert run('', 'bar name=b') == run('bar name=b')
+
+
+def test_shell_query_help():
+    lines = run('-h', 'bar name=b')
+    assert lines[0].startswith('usage: ')
+    # the shell goes on with the next query
+    assert lines[-5:] == run('bar name=b')
+
+
+def test_shell_app():
+    assert run('app') == [repr(MyApp), repr(OtherApp), ""]
+    assert run('app dectate.tests.test_shell.OtherApp', 'app', 'app -',
+               'app') == [repr(OtherApp), repr(MyApp), repr(OtherApp), ""]
+    assert run('app dectate.tests.nothere') == [
+        "Error: Cannot resolve dotted name: 'dectate.tests.nothere'", ""]
+
+
+def test_shell_app_query():
+    lines = run('app dectate.tests.test_shell.OtherApp', 'foo')
+    assert lines[0] == "App: %r" % OtherApp
+    assert lines[2] == "  @OtherApp.foo('d')"
+    assert run('--app=dectate.tests.test_shell.OtherApp foo') == lines
+
+
+def test_shell_format():
+    assert run('format', 'format ndjson', 'format', 'format xml') == [
+        "text", "ndjson", "Error: Unknown format: xml", ""]
+    lines = run('format csv', 'foo name=a')
+    assert lines[0] == "app,directive,path,lineno,sourceline,kind,name"
+    assert run('--format=csv foo name=a') == lines
+
+
+def test_shell_count():
+    assert run('count foo') == [
+        "App: %r" % MyApp, "  3", "App: %r" % OtherApp, "  1", ""]
+    assert run('count foo kind=x') == [
+        "App: %r" % MyApp, "  2", "App: %r" % OtherApp, "  0", ""]
+    assert run('count bar by name') == ["App: %r" % MyApp, "  b: 1", ""]
+    assert run('count foo by kind') == [
+        "App: %r" % MyApp, "  x: 2", "  None: 1",
+        "App: %r" % OtherApp, "  None: 1", ""]
+    assert run('count') == [
+        "Error: the following arguments are required: directive", ""]
+
+
+def test_shell_join():
+    lines = run('join foo kind=x with bar on name')
+    assert lines[0] == "App: %r" % MyApp
+    assert lines[2] == "  @MyApp.foo('b', kind='x')"
+    assert lines[4] == "    @MyApp.bar('b')"
+    assert len(lines) == 7
+    assert run('join foo with bar name') == [
+        "Error: usage: join DIRECTIVE [FILTER...] with DIRECTIVE "
+        "[FILTER...] on NAME", ""]
+
+
+def test_shell_quit():
+    assert run('quit', 'foo') == []
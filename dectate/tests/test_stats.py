@@ -0,0 +1,119 @@
+import sys
+
+from dectate.config import Action, Composite, commit
+from dectate.app import App, directive
+from dectate.stats import app_stats, deep_sizeof, format_stats
+
+
+def test_app_stats():
+    class FooAction(Action):
+        config = {
+            'registry': list
+        }
+
+        def __init__(self, name):
+            self.name = name
+
+        def identifier(self, registry):
+            return self.name
+
+        def perform(self, obj, registry):
+            registry.append(self.name)
+
+    class BarAction(Action):
+        def identifier(self):
+            return ()
+
+        def perform(self, obj):
+            pass
+
+    class FoosAction(Composite):
+        def __init__(self, names):
+            self.names = names
+
+        def actions(self, obj):
+            return [(FooAction(name), obj) for name in self.names]
+
+    class MyApp(App):
+        foo = directive(FooAction)
+        foos = directive(FoosAction)
+        bar = directive(BarAction)
+
+    class SubApp(MyApp):
+        pass
+
+    @MyApp.foo('a')
+    def f():
+        pass
+
+    @MyApp.foo('b')
+    def g():
+        pass
+
+    @SubApp.foo('b')
+    def h():
+        pass
+
+    @SubApp.foos(['c', 'd', 'e'])
+    def i():
+        pass
+
+    commit(SubApp)
+
+    stats = app_stats(SubApp)
+    assert stats['app'] == 'dectate.tests.test_stats.SubApp'
+    assert stats['commit_duration'] > 0
+    bar_stats, foo_stats = stats['groups']
+    assert bar_stats['action_class'] == 'dectate.tests.test_stats.BarAction'
+    assert bar_stats['actions'] == 0
+    assert bar_stats['config_size'] == deep_sizeof(())
+    assert foo_stats['action_class'] == 'dectate.tests.test_stats.FooAction'
+    assert foo_stats['directives'] == 2
+    assert foo_stats['actions'] == 4
+    assert foo_stats['inherited'] == 1
+    assert foo_stats['overridden'] == 1
+    assert foo_stats['composites'] == 1
+    assert foo_stats['composite_actions'] == 3
+    assert SubApp.config.registry == ['a', 'b', 'c', 'd', 'e']
+    assert foo_stats['config_size'] == deep_sizeof((SubApp.config.registry,))
+
+    stats = app_stats(MyApp)
+    bar_stats, foo_stats = stats['groups']
+    assert foo_stats['directives'] == 2
+    assert foo_stats['actions'] == 2
+    assert foo_stats['inherited'] == 0
+    assert foo_stats['overridden'] == 0
+
+    lines = list(format_stats([MyApp, SubApp]))
+    assert lines[0].startswith('App: dectate.tests.test_stats.MyApp ')
+    assert lines[1].split() == [
+        'action_class', 'directives', 'actions', 'inherited', 'overridden',
+        'composites', 'composite_actions', 'config_size']
+    assert lines[8].split()[:7] == [
+        'dectate.tests.test_stats.FooAction', '2', '4', '1', '1', '1', '3']
+
+
+def test_deep_sizeof():
+    class Slotted(object):
+        __slots__ = ('a', 'b')
+
+        def __init__(self):
+            self.a = 'x' * 100
+
+    class Plain(object):
+        def __init__(self):
+            self.a = 'y' * 100
+
+    s = Slotted()
+    assert deep_sizeof(s) == sys.getsizeof(s) + sys.getsizeof(s.a)
+
+    shared = 'z' * 100
+    assert deep_sizeof([shared, shared]) == (
+        sys.getsizeof([shared, shared]) + sys.getsizeof(shared))
+
+    p = Plain()
+    assert deep_sizeof(p) >= sys.getsizeof(p) + sys.getsizeof(p.a)
+
+    # classes and functions are not followed
+    assert deep_sizeof([Plain]) == (
+        sys.getsizeof([Plain]) + sys.getsizeof(Plain))
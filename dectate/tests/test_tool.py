@@ -1,3 +1,4 @@
+import json
 import pytest
 from argparse import ArgumentTypeError
 
@@ -6,8 +7,15 @@ from dectate.app import App, directive
 from dectate.tool import (parse_app_class, parse_directive, parse_filters,
                           convert_filters,
                           convert_dotted_name, convert_bool,
-                          query_tool_output, query_app, ToolError)
+                          query_tool_output, query_app, source_paths,
+                          batch_output, filter_names, value_text,
+                          query_results, app_records, format_json,
+                          format_ndjson, format_csv, format_text,
+                          get_fork_context, resolve_dotted_name,
+                          resolve_cache,
+                          ToolError)
 from dectate import compat
+from dectate.sentinel import NOT_FOUND
 
 
 def builtin_ref(s):
@@ -250,6 +258,39 @@ def test_query_tool_uncommitted():
         list(query_tool_output([MyApp], 'foo', {'name': 'a'}))
 
 
+def test_query_tool_partially_committed():
+    class FooAction(Action):
+        def __init__(self, name):
+            self.name = name
+
+        def identifier(self):
+            return self.name
+
+        def perform(self, obj):
+            pass
+
+    class BarAction(FooAction):
+        pass
+
+    class MyApp(App):
+        foo = directive(FooAction)
+        bar = directive(BarAction)
+
+    @MyApp.foo('a')
+    def f():
+        pass
+
+    @MyApp.bar('b')
+    def g():
+        pass
+
+    commit(MyApp, only=['foo'])
+
+    assert len(list(query_tool_output([MyApp], 'foo', {'name': 'a'}))) == 4
+    with pytest.raises(ToolError):
+        list(query_tool_output([MyApp], 'bar', {'name': 'b'}))
+
+
 def test_convert_bool():
     assert convert_bool('True')
     assert not convert_bool('False')
@@ -306,3 +347,412 @@ def test_inheritance():
     l = list(query_app(SubApp, 'foo'))
 
     assert len(l) == 2
+
+
+def test_query_tool_output_uncommitted():
+    class FooAction(Action):
+        def __init__(self, name):
+            self.name = name
+
+        def identifier(self):
+            return self.name
+
+        def perform(self, obj):
+            raise AssertionError("should not be performed")
+
+    class MyApp(App):
+        foo = directive(FooAction)
+
+    class SubApp(MyApp):
+        pass
+
+    @MyApp.foo('a')
+    def f():
+        pass
+
+    @SubApp.foo('b')
+    def g():
+        pass
+
+    l = list(query_tool_output([SubApp], 'foo', {'name': 'a'},
+                               uncommitted=True))
+
+    assert len(l) == 4
+    assert not SubApp.is_committed()
+
+
+def test_source_paths():
+    from dectate.tests.fixtures import anapp
+
+    class MyApp(anapp.AnApp):
+        pass
+
+    @MyApp.foo('a')
+    def f():
+        pass
+
+    paths = source_paths([MyApp])
+    assert paths == {__file__.replace('.pyc', '.py'),
+                     anapp.__file__.replace('.pyc', '.py')}
+
+
+def test_batch_output():
+    class FooAction(Action):
+        def __init__(self, name):
+            self.name = name
+
+        def identifier(self):
+            return self.name
+
+        def perform(self, obj):
+            pass
+
+    class MyApp(App):
+        foo = directive(FooAction)
+
+    @MyApp.foo('a')
+    def f():
+        pass
+
+    @MyApp.foo('b c')
+    def g():
+        pass
+
+    commit(MyApp)
+
+    l = list(batch_output([MyApp], [
+        'foo name=a\n',
+        '\n',
+        '# a comment\n',
+        'foo "name=b c"\n',
+        'foo name\n',
+        'foo "name=b\n',
+        '--app=dectate.tests.fixtures.nothere.AnApp foo\n',
+        'foo name=d\n',
+    ]))
+
+    assert l[0] == 'Query: foo name=a'
+    assert l[1].startswith('App: ')
+    assert l[3] == "  @MyApp.foo('a')"
+    assert l[5] == 'Query: foo "name=b c"'
+    assert l[8] == "  @MyApp.foo('b c')"
+    assert l[10:] == [
+        'Query: foo name',
+        'Error: Cannot parse query filter, no =.',
+        'Query: foo "name=b',
+        'Error: No closing quotation',
+        'Query: --app=dectate.tests.fixtures.nothere.AnApp foo',
+        "Error: argument --app: Cannot resolve dotted name: "
+        "'dectate.tests.fixtures.nothere.AnApp'",
+        'Query: foo name=d']
+
+
+def test_batch_output_help():
+    class FooAction(Action):
+        def __init__(self, name):
+            self.name = name
+
+        def identifier(self):
+            return self.name
+
+        def perform(self, obj):
+            pass
+
+    class MyApp(App):
+        foo = directive(FooAction)
+
+    @MyApp.foo('a')
+    def f():
+        pass
+
+    commit(MyApp)
+
+    lines = list(batch_output([MyApp], ['--help', 'foo name=a']))
+    assert lines[0] == 'Query: --help'
+    assert lines[1].startswith('Error: usage: ')
+    assert lines[2] == 'Query: foo name=a'
+    assert lines[3].startswith('App: ')
+
+
+def test_batch_output_defaults():
+    class FooAction(Action):
+        def __init__(self, name):
+            self.name = name
+
+        def identifier(self):
+            return self.name
+
+        def perform(self, obj):
+            pass
+
+    class MyApp(App):
+        foo = directive(FooAction)
+
+    @MyApp.foo('a')
+    def f():
+        pass
+
+    l = list(batch_output([MyApp], ['foo', '--format=text foo'], {
+        'format': 'ndjson', 'jobs': 1, 'uncommitted': True}))
+
+    assert l[0] == 'Query: foo'
+    assert json.loads(l[1])['attributes'] == {'name': 'a'}
+    assert l[2] == 'Query: --format=text foo'
+    assert l[3].startswith('App: ')
+
+
+def test_filter_names():
+    class FooAction(Action):
+        filter_name = {
+            'foo': '_foo'
+        }
+
+        def __init__(self, name, model=None, *args, **kw):
+            pass
+
+    assert filter_names(FooAction) == ['foo', 'model', 'name']
+
+    class BarAction(Action):
+        pass
+
+    assert filter_names(BarAction) == []
+
+
+def test_value_text():
+    from dectate.tests.fixtures import anapp
+
+    assert value_text('foo') == 'foo'
+    assert value_text(1) == '1'
+    assert value_text(True) == 'True'
+    assert value_text(anapp.OtherClass) == \
+        'dectate.tests.fixtures.anapp.OtherClass'
+    assert value_text(anapp.other) == 'dectate.tests.fixtures.anapp.other'
+    assert value_text(anapp) == 'dectate.tests.fixtures.anapp'
+
+
+def format_app():
+    class FooAction(Action):
+        filter_convert = {
+            'model': convert_dotted_name
+        }
+
+        def __init__(self, name, model, **kw):
+            self.name = name
+            self.model = model
+            self.kw = kw
+
+        def filter_get_value(self, name):
+            return self.kw.get(name, NOT_FOUND)
+
+        def identifier(self):
+            return self.name
+
+        def perform(self, obj):
+            pass
+
+    class MyApp(App):
+        foo = directive(FooAction)
+
+    from dectate.tests.fixtures import anapp
+
+    @MyApp.foo('a', anapp.OtherClass, extra=1)
+    def f():
+        pass
+
+    @MyApp.foo('b', None)
+    def g():
+        pass
+
+    commit(MyApp)
+    return MyApp
+
+
+def test_format_ndjson():
+    import json
+
+    MyApp = format_app()
+    lines = list(format_ndjson(app_records(
+        'foo', query_results([MyApp], 'foo', {}))))
+    assert len(lines) == 2
+    record = json.loads(lines[0])
+    assert record['app'] == 'dectate.tests.test_tool.MyApp'
+    assert record['directive'] == 'foo'
+    assert record['path'] == __file__.replace('.pyc', '.py')
+    assert record['sourceline'] == \
+        "@MyApp.foo('a', anapp.OtherClass, extra=1)"
+    assert record['attributes'] == {
+        'name': 'a',
+        'model': 'dectate.tests.fixtures.anapp.OtherClass',
+        'extra': '1'}
+    assert json.loads(lines[1])['attributes'] == {
+        'name': 'b', 'model': 'None'}
+
+
+def test_format_json():
+    import json
+
+    MyApp = format_app()
+    lines = list(format_json(app_records(
+        'foo', query_results([MyApp], 'foo', {'name': 'b'}))))
+    assert len(lines) == 2
+    records = json.loads('\n'.join(lines))
+    assert [record['attributes']['name'] for record in records] == ['b']
+
+    lines = list(format_json(app_records(
+        'foo', query_results([MyApp], 'foo', {}))))
+    assert len(lines) == 3
+    assert len(json.loads('\n'.join(lines))) == 2
+
+    assert list(format_json(app_records(
+        'foo', query_results([MyApp], 'foo', {'name': 'c'})))) == ['[]']
+    assert list(format_json(app_records(
+        'bar', query_results([MyApp], 'bar', {})))) == ['[]']
+
+
+def test_format_csv():
+    import csv
+
+    MyApp = format_app()
+    lines = list(format_csv(app_records(
+        'foo', query_results([MyApp], 'foo', {}))))
+    rows = list(csv.reader(lines))
+    assert rows[0] == ['app', 'directive', 'path', 'lineno', 'sourceline',
+                       'model', 'name']
+    assert rows[1][0] == 'dectate.tests.test_tool.MyApp'
+    assert rows[1][4] == "@MyApp.foo('a', anapp.OtherClass, extra=1)"
+    assert rows[1][5:] == ['dectate.tests.fixtures.anapp.OtherClass', 'a']
+    assert rows[2][5:] == ['None', 'b']
+    assert len(rows) == 3
+
+
+def test_query_records_without_directive():
+    class FooAction(Action):
+        def __init__(self, name):
+            self.name = name
+
+        def identifier(self):
+            return self.name
+
+        def perform(self, obj):
+            pass
+
+    class MyApp(App):
+        foo = directive(FooAction)
+
+    commit(MyApp)
+
+    # an action that was not created by a directive
+    action = FooAction('a')
+    action.order = 0
+    MyApp.dectate.get_action_group(FooAction)._action_map['a'] = (
+        action, None)
+
+    [(app_class, action_class, records)] = app_records(
+        'foo', query_results([MyApp], 'foo', {}))
+    assert list(records) == [{
+        'app': 'dectate.tests.test_tool.MyApp',
+        'directive': 'foo',
+        'path': None,
+        'lineno': None,
+        'sourceline': None,
+        'attributes': {'name': 'a'}}]
+
+    assert list(query_tool_output([MyApp], 'foo', {})) == [
+        'App: %r' % MyApp,
+        '  foo name=a',
+        '']
+
+
+@pytest.mark.skipif(get_fork_context() is None,
+                    reason="requires forking worker processes")
+def test_app_records_jobs():
+    class FooAction(Action):
+        def __init__(self, name):
+            self.name = name
+
+        def identifier(self):
+            return self.name
+
+        def perform(self, obj):
+            pass
+
+    class Base(App):
+        foo = directive(FooAction)
+
+    class AlphaApp(Base):
+        pass
+
+    class BetaApp(Base):
+        pass
+
+    class GammaApp(Base):
+        pass
+
+    @AlphaApp.foo('a')
+    def f():
+        pass
+
+    @GammaApp.foo('b')
+    def g():
+        pass
+
+    @GammaApp.foo('c')
+    def h():
+        pass
+
+    commit(AlphaApp, BetaApp, GammaApp)
+
+    app_classes = [AlphaApp, BetaApp, GammaApp]
+
+    def records(jobs):
+        return [(app_class, action_class, list(records))
+                for app_class, action_class, records in app_records(
+                    'foo', query_results(app_classes, 'foo', {}), jobs)]
+
+    serial = records(1)
+    assert [len(records) for app_class, action_class, records
+            in serial] == [1, 0, 2]
+    assert records(2) == serial
+    assert records(8) == serial
+
+    assert list(format_text(app_records(
+        'foo', query_results(app_classes, 'foo', {}), 2))) == list(
+            query_tool_output(app_classes, 'foo', {}))
+
+
+def test_resolve_dotted_name_cache():
+    import sys
+    from dectate.tests.fixtures import anapp
+
+    name = 'dectate.tests.fixtures.anapp.OtherClass'
+    assert resolve_dotted_name(name) is anapp.OtherClass
+    assert resolve_cache[tuple(name.split('.'))] == (
+        'dectate.tests.fixtures.anapp', ('OtherClass',))
+    assert resolve_dotted_name(name) is anapp.OtherClass
+
+    assert resolve_dotted_name('dectate.tests.fixtures.anapp') is anapp
+    assert resolve_dotted_name('.anapp.other',
+                               'dectate.tests.fixtures') is anapp.other
+
+    # a replaced module is picked up
+    del sys.modules['dectate.tests.fixtures.anapp']
+    try:
+        other_class = resolve_dotted_name(name)
+        assert other_class is not anapp.OtherClass
+        assert (other_class is
+                sys.modules['dectate.tests.fixtures.anapp'].OtherClass)
+    finally:
+        sys.modules['dectate.tests.fixtures.anapp'] = anapp
+        sys.modules['dectate.tests.fixtures'].anapp = anapp
+
+    # as are removed attributes
+    anapp.Removed = object()
+    resolve_dotted_name('dectate.tests.fixtures.anapp.Removed')
+    del anapp.Removed
+    with pytest.raises(ImportError):
+        resolve_dotted_name('dectate.tests.fixtures.anapp.Removed')
+
+
+def test_resolve_dotted_name_relative_without_module():
+    with pytest.raises(ValueError):
+        resolve_dotted_name('.anapp')
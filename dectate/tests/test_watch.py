@@ -0,0 +1,185 @@
+import os
+import sys
+import textwrap
+
+import pytest
+
+from dectate.app import unregister_module, reload_modules
+from dectate.query import Query
+from dectate.watch import Watcher, modules_for_paths
+
+
+BASE = '''
+import dectate
+
+
+class FooAction(dectate.Action):
+    def __init__(self, name):
+        self.name = name
+
+    def identifier(self):
+        return self.name
+
+    def perform(self, obj):
+        pass
+
+
+class WatchApp(dectate.App):
+    foo = dectate.directive(FooAction)
+'''
+
+VIEWS = '''
+from {package}.base import WatchApp
+
+
+@WatchApp.foo({name!r})
+def f():
+    pass
+
+
+@WatchApp.foo('b')
+def g():
+    pass
+'''
+
+
+@pytest.fixture
+def package(tmpdir):
+    name = 'watchpackage%s' % id(tmpdir)
+    tmpdir.mkdir(name).join('__init__.py').write('')
+    tmpdir.join(name, 'base.py').write(textwrap.dedent(BASE))
+    write_views(tmpdir, name, 'a')
+    sys.path.insert(0, str(tmpdir))
+    sys.dont_write_bytecode = True
+    try:
+        yield name
+    finally:
+        sys.dont_write_bytecode = False
+        sys.path.remove(str(tmpdir))
+        for module_name in list(sys.modules):
+            if module_name.startswith(name):
+                del sys.modules[module_name]
+
+
+def write_views(tmpdir, package, name):
+    path = tmpdir.join(package, 'views.py')
+    # make sure the modification time differs from the previous one
+    previous = path.mtime() if path.check() else 0
+    path.write(VIEWS.format(package=package, name=name))
+    mtime = max(path.mtime(), previous + 1)
+    os.utime(str(path), (mtime, mtime))
+
+
+def names(app_class):
+    return [attrs['name'] for attrs in Query('foo').attrs('name')(app_class)]
+
+
+def test_watcher(package, tmpdir):
+    __import__(package + '.views')
+    app_class = sys.modules[package + '.base'].WatchApp
+    app_class.commit()
+    assert names(app_class) == ['a', 'b']
+
+    watcher = Watcher([app_class])
+    assert watcher.changed_paths() == set()
+
+    write_views(tmpdir, package, 'c')
+    paths = watcher.changed_paths()
+    assert paths == {str(tmpdir.join(package, 'views.py'))}
+    assert watcher.changed_paths() == set()
+
+    assert watcher.reload(paths) == [package + '.views']
+    assert watcher.app_classes == [app_class]
+    assert names(app_class) == ['c', 'b']
+
+
+def test_watcher_reload_app_module(package, tmpdir):
+    __import__(package + '.views')
+    base = sys.modules[package + '.base']
+    app_class = base.WatchApp
+    app_class.commit()
+
+    watcher = Watcher([app_class])
+    paths = {base.__file__}
+    # views uses directives on the app, so it is reloaded too
+    assert watcher.reload(paths) == [package + '.base', package + '.views']
+    new_app_class = watcher.app_classes[0]
+    assert new_app_class is not app_class
+    assert new_app_class is sys.modules[package + '.base'].WatchApp
+    assert new_app_class.is_committed()
+    assert names(new_app_class) == ['a', 'b']
+
+
+SUB = '''
+from {package}.base import WatchApp
+
+
+class SubApp(WatchApp):
+    pass
+
+
+@SubApp.foo('y')
+def f():
+    pass
+'''
+
+
+def test_reload_modules_base_in_other_module(package, tmpdir):
+    tmpdir.join(package, 'sub.py').write(SUB.format(package=package))
+    __import__(package + '.views')
+    __import__(package + '.sub')
+    sub_app = sys.modules[package + '.sub'].SubApp
+    sub_app.commit()
+    assert names(sub_app) == ['a', 'b', 'y']
+
+    result = reload_modules(package + '.base')
+    new_sub_app = sys.modules[package + '.sub'].SubApp
+    new_app_class = sys.modules[package + '.base'].WatchApp
+    assert new_sub_app is not sub_app
+    assert issubclass(new_sub_app, new_app_class)
+    assert set(result) == {new_app_class, new_sub_app}
+    assert names(new_sub_app) == ['a', 'b', 'y']
+
+
+def test_modules_for_paths(package):
+    __import__(package + '.views')
+    module = sys.modules[package + '.views']
+    assert modules_for_paths([module.__file__]) == [module]
+    assert modules_for_paths(['/not/there.py']) == []
+
+
+def test_unregister_module(package):
+    __import__(package + '.views')
+    app_class = sys.modules[package + '.base'].WatchApp
+    directives = app_class.dectate._directives
+    assert [directive.code_info.module for directive, obj in directives] == [
+        package + '.views', package + '.views']
+
+    assert unregister_module(package + '.views') == [app_class]
+    assert app_class.dectate._directives == []
+    assert unregister_module(package + '.views') == []
+
+
+def test_reload_modules(package, tmpdir):
+    __import__(package + '.views')
+    app_class = sys.modules[package + '.base'].WatchApp
+
+    class SubApp(app_class):
+        pass
+
+    class OtherApp(app_class):
+        pass
+
+    SubApp.commit()
+    config = SubApp.config
+
+    write_views(tmpdir, package, 'c')
+    # the base was committed along with SubApp
+    assert set(reload_modules(package + '.views')) == {app_class, SubApp}
+    assert names(SubApp) == ['c', 'b']
+    assert SubApp.config is not config
+    assert not OtherApp.is_committed()
+
+    # reloading again does not register the directives twice
+    assert set(reload_modules(package + '.views')) == {app_class, SubApp}
+    assert names(SubApp) == ['c', 'b']
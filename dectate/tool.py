@@ -1,23 +1,47 @@
 from __future__ import print_function
 
 import argparse
+import csv
+import importlib
 import inspect
-from .query import Query, get_action_class
+import json
+import multiprocessing
+import os
+import shlex
+import sys
+from itertools import chain
+from .query import (Query, get_action_class, expand_action_classes,
+                    value_getter)
+from .config import dotted_name, get_group_classes
 from .error import QueryError
 from .app import App
-from .compat import text_type
+from .compat import text_type, string_types, getargspec
+from .sentinel import NOT_FOUND
 
 
 class ToolError(Exception):
     pass
 
 
+class HelpRequested(ToolError):
+    """Raised by :class:`QueryArgumentParser` when help is asked for.
+
+    The message is the usage of the query arguments; the ``help``
+    attribute has the complete help text.
+    """
+    def __init__(self, usage, help):
+        ToolError.__init__(self, usage)
+        self.help = help
+
+
 def query_tool(app_classes):
     """Command-line query tool for dectate.
 
     Uses command-line arguments to do the query and prints the results.
 
-    usage: decq [-h] [--app APP] directive <filter>
+    usage: decq [-h] [--app APP] [--uncommitted] [--format FORMAT]
+                [--jobs N] [--serve SOCKET] [--reload] [--export-index FILE]
+                [--batch [FILE]] [--watch] [--stats] directive <filter>
 
     Query all directives named ``foo`` in given app classes::
 
@@ -31,23 +55,164 @@ def query_tool(app_classes):
 
       $ decq --app=myproject.App foo
 
+    Output the results as JSON, a JSON record per line or CSV::
+
+      $ decq --format=json foo
+      $ decq --format=ndjson foo
+      $ decq --format=csv foo
+
+    Query many apps in 4 worker processes::
+
+      $ decq --jobs=4 foo
+
+    Query directives ``foo`` without requiring the apps to be committed::
+
+      $ decq --uncommitted foo
+
+    Keep the apps in a server process that answers queries on a Unix
+    socket, restarting it when source files change::
+
+      $ decq --serve=/tmp/decq.sock --reload
+
+    Such a server can then be queried with ``decq-client``, which does
+    not need to import your project::
+
+      $ decq-client --socket=/tmp/decq.sock foo name=alpha
+
+    Export the committed configuration to an index file, which
+    ``decq-client`` can query without importing your project::
+
+      $ decq --export-index=decq.db
+      $ decq-client --index=decq.db foo name=alpha
+
+    Issue many queries in one go, one per line, read from standard input
+    or from a file::
+
+      $ decq --batch queries.txt
+
+    Query again each time a source file of the configuration changes,
+    reloading the changed modules::
+
+      $ decq --watch foo
+
+    Report statistics about the configuration of the apps, such as the
+    amount of directives and actions per action group, the size of the
+    config objects and how long the last commit took::
+
+      $ decq --stats
+
+    Answer queries interactively, without importing and committing the
+    apps again for each query. Besides queries, the shell has commands
+    to select apps and the output format, to count results and to join
+    the results of two queries::
+
+      $ decq --shell
+      decq> foo name=alpha
+      decq> count foo by name
+      decq> join foo with bar on name
+
     :param app_classes: a list of :class:`App` subclasses to query by default.
     """
-    parser = argparse.ArgumentParser(description="Query Dectate actions")
-    parser.add_argument('--app', help="Dotted name for App subclass.",
-                        type=parse_app_class, action='append')
-    parser.add_argument('directive', help="Name of the directive.")
+    parser = make_parser(argparse.ArgumentParser)
+    parser.add_argument('--serve', metavar='SOCKET',
+                        help="Serve queries on a Unix socket.")
+    parser.add_argument('--reload', action='store_true',
+                        help="Restart the server when source files change.")
+    parser.add_argument('--export-index', metavar='FILE',
+                        help="Export the configuration to an index file.")
+
+    parser.add_argument('--batch', metavar='FILE', nargs='?', const='-',
+                        help="Read queries from a file, one per line. "
+                        "Reads from standard input if no file is given.")
+    parser.add_argument('--watch', action='store_true',
+                        help="Reload and query again when source files "
+                        "change.")
+    parser.add_argument('--stats', action='store_true',
+                        help="Report statistics about the configuration "
+                        "instead of querying.")
+    parser.add_argument('--shell', action='store_true',
+                        help="Answer queries interactively.")
 
     args, filters = parser.parse_known_args()
 
-    if args.app:
-        app_classes = args.app
+    if args.stats:
+        from .stats import format_stats
+        if args.app:
+            app_classes = args.app
+        for app_class in app_classes:
+            if not app_class.is_committed():
+                parser.error("App %r was not committed." % app_class)
+            if app_class.dectate.frozen:
+                parser.error("App %r is frozen." % app_class)
+        for line in format_stats(app_classes):
+            print(line)
+        return
+
+    if args.watch:
+        from .watch import watch
+        if args.directive is None:
+            parser.error("the following arguments are required: directive")
+        if args.app:
+            app_classes, args.app = args.app, None
+
+        def query(app_classes):
+            try:
+                return list(query_lines(app_classes, args, filters))
+            except ToolError as e:
+                return ["Error: %s" % e]
+
+        watch(app_classes, query)
+        return
+
+    if args.shell:
+        from .shell import QueryShell
+        if args.app:
+            app_classes = args.app
+        QueryShell(app_classes).cmdloop()
+        return
+
+    if args.batch is not None:
+        if args.app:
+            app_classes = args.app
+        if args.batch == '-':
+            f = sys.stdin
+        else:
+            f = open(args.batch)
+        try:
+            for line in batch_output(app_classes, f, query_defaults(args)):
+                print(line)
+                sys.stdout.flush()
+        finally:
+            if f is not sys.stdin:
+                f.close()
+        return
+
+    if args.export_index is not None:
+        from .index import write_index
+        if args.app:
+            app_classes = args.app
+        for app_class in app_classes:
+            if not app_class.is_committed():
+                parser.error("App %r was not committed." % app_class)
+        write_index(args.export_index, app_classes)
+        return
+
+    if args.serve is not None:
+        from .server import QueryServer
+        if args.app:
+            app_classes = args.app
+        server = QueryServer(args.serve, app_classes, query_defaults(args))
+        try:
+            server.run(args.reload)
+        finally:
+            server.server_close()
+        return
 
-    filters = parse_filters(filters)
+    if args.directive is None:
+        parser.error("the following arguments are required: directive")
 
     try:
-        lines = list(query_tool_output(app_classes, args.directive,
-                                       filters))
+        lines = query_lines(app_classes, args, filters)
     except ToolError as e:
         parser.error(text_type(e))
 
@@ -55,26 +220,499 @@ def query_tool(app_classes):
         print(line)
 
 
-def query_tool_output(app_classes, directive, filters):
+class QueryArgumentParser(argparse.ArgumentParser):
+    """Argument parser that raises :exc:`ToolError` instead of exiting.
+
+    Asking for help with ``-h`` or ``--help`` raises
+    :exc:`HelpRequested` instead of printing the help.
+    """
+    def error(self, message):
+        raise ToolError(message)
+
+    def print_help(self, file=None):
+        raise HelpRequested(' '.join(self.format_usage().split()),
+                            self.format_help())
+
+    def exit(self, status=0, message=None):
+        raise ToolError(message or "exited with status %s" % status)
+
+
+def make_parser(parser_class):
+    """Make a parser for the query arguments.
+
+    :param parser_class: the :class:`argparse.ArgumentParser` subclass to
+      use.
+    :return: a parser instance.
+    """
+    parser = parser_class(description="Query Dectate actions")
+    parser.add_argument('--app', help="Dotted name for App subclass.",
+                        type=parse_app_class, action='append')
+    parser.add_argument('--uncommitted', action='store_true',
+                        help="Query the registered directives of apps "
+                        "that are not committed.")
+    parser.add_argument('--format', default='text',
+                        choices=['text', 'json', 'ndjson', 'csv'],
+                        help="Output format.")
+    parser.add_argument('--jobs', type=int, default=1, metavar='N',
+                        help="Query apps in N worker processes.")
+    parser.add_argument('directive', help="Name of the directive.",
+                        nargs='?')
+    return parser
+
+
+def query_lines(app_classes, args, filters):
+    """Output lines for parsed query arguments.
+
+    :param app_classes: the :class:`App` subclasses to query if
+      ``--app`` is not given.
+    :param args: the arguments as parsed by the parser from
+      :func:`make_parser`.
+    :param filters: the remaining unparsed arguments, which are filters.
+    :return: iterable of lines.
+    """
+    if args.app:
+        app_classes = args.app
+    results = query_results(app_classes, args.directive,
+                            parse_filters(filters), args.uncommitted)
+    records = app_records(args.directive, results, args.jobs)
+    if args.format == 'csv':
+        return format_csv(records, [r[1] for r in results])
+    return FORMATS[args.format](records)
+
+
+def query_defaults(args):
+    """Get the options of ``decq`` that queries it runs default to.
+
+    :param args: the arguments as parsed by the parser from
+      :func:`make_parser`.
+    :return: a dict with the ``format``, ``jobs`` and ``uncommitted``
+      options.
+    """
+    return {
+        'format': args.format,
+        'jobs': args.jobs,
+        'uncommitted': args.uncommitted,
+    }
+
+
+def batch_output(app_classes, queries, defaults=None):
+    """Output lines for a batch of queries.
+
+    Each query is a line with the arguments as you would give them to
+    ``decq``. Empty lines and lines starting with ``#`` are skipped.
+
+    For each query a block is output that starts with a ``Query:``
+    line that repeats the query. It is followed by the output of the
+    query, or by an ``Error:`` line if the query failed. Asking for
+    help gives an ``Error:`` line with the usage.
+
+    :param app_classes: the :class:`App` subclasses to query if
+      ``--app`` is not given.
+    :param queries: iterable of query lines.
+    :param defaults: a dict with values for the options that queries
+      don't give, as returned by :func:`query_defaults`.
+    :return: iterable of lines.
+    """
+    parser = make_parser(QueryArgumentParser)
+    if defaults:
+        parser.set_defaults(**defaults)
+    for query in queries:
+        query = query.strip()
+        if not query or query.startswith('#'):
+            continue
+        yield "Query: %s" % query
+        try:
+            args, filters = parser.parse_known_args(shlex.split(query))
+            if args.directive is None:
+                raise ToolError(
+                    "the following arguments are required: directive")
+            lines = list(query_lines(app_classes, args, filters))
+        except (ToolError, ValueError) as e:
+            yield "Error: %s" % e
+            continue
+        for line in lines:
+            yield line
+
+
+def source_paths(app_classes):
+    """Get the paths of the source files the configuration comes from.
+
+    These are the files that define the app classes and the files that
+    directives were used in, for the app classes and the classes they
+    extend. For frozen app classes the directives are no longer known,
+    so only the files that define them are included.
+
+    :param app_classes: an iterable of :class:`App` subclasses.
+    :return: a set of paths.
+    """
+    result = set()
+    seen = set()
+    stack = [app_class.dectate for app_class in app_classes]
+    while stack:
+        configurable = stack.pop()
+        if configurable in seen:
+            continue
+        seen.add(configurable)
+        stack.extend(configurable.extends)
+        if configurable.app_class is App:
+            continue
+        try:
+            result.add(inspect.getsourcefile(configurable.app_class))
+        except TypeError:
+            pass
+        if configurable._directives is None:
+            continue  # frozen
+        for directive, obj in configurable._directives:
+            result.add(directive.code_info.path)
+    result.discard(None)
+    return result
+
+
+def check_only(app_class, directive, action_class):
+    """Check that a partial commit performed the actions of a directive.
+
+    See ``commit(..., only=...)``.
+
+    :param app_class: a committed :class:`App` subclass.
+    :param directive: name of the directive.
+    :param action_class: the action class of the directive, or ``None``
+      if the app class has no such directive.
+    """
+    only = app_class.dectate._only
+    if only is None or action_class is None:
+        return
+    group_classes = get_group_classes(action_class)
+    if group_classes is not None and not group_classes <= only:
+        raise ToolError("App %r was committed without directive: %s" %
+                        (app_class, directive))
+
+
+def query_tool_output(app_classes, directive, filters, uncommitted=False):
+    for line in format_text(app_records(
+            directive, query_results(app_classes, directive, filters,
+                                     uncommitted))):
+        yield line
+
+
+def query_results(app_classes, directive, filters, uncommitted=False):
+    """Set up queries for a directive with raw filters.
+
+    The queries are not executed yet, but everything that can go wrong
+    before that is checked, so that output can be streamed.
+
+    :param app_classes: the :class:`App` subclasses to query.
+    :param directive: name of directive to query.
+    :param filters: dict with raw (unconverted) filter values.
+    :param uncommitted: if true, query the registered directives of
+      the app classes instead of requiring them to be committed.
+    :return: list of ``app_class, action_class, results`` tuples, where
+      ``action_class`` is ``None`` if the app class has no such directive
+      and ``results`` is an iterable of ``action, obj`` tuples.
+    """
+    result = []
     for app_class in app_classes:
-        if not app_class.is_committed():
-            raise ToolError("App %r was not committed." % app_class)
+        action_class = parse_directive(app_class, directive)
+        query = build_query(app_class, directive, filters)
+        if uncommitted:
+            results = query.introspect(app_class)
+        else:
+            if not app_class.is_committed():
+                raise ToolError("App %r was not committed." % app_class)
+            check_only(app_class, directive, action_class)
+            results = query(app_class)
+        result.append((app_class, action_class, results))
+    return result
+
+
+def app_records(directive, query_results, jobs=1):
+    """Get records for query results, per app.
+
+    A record is a dict with the dotted name of the ``app`` class, the
+    ``directive`` name, the ``path``, ``lineno`` and ``sourceline``
+    where the directive was used, and the ``attributes`` of the action
+    in text form as a dict. The location is ``None`` for actions not
+    created by a directive.
+
+    If ``jobs`` is more than one and there is more than one app to
+    query, the apps are queried in that many worker processes. These
+    are forked from this process, so they share the imported and
+    committed apps. The records are returned in the same order as
+    without workers.
+
+    :param directive: the name of the directive queried.
+    :param query_results: as returned by :func:`query_results`.
+    :param jobs: the amount of worker processes to use.
+    :return: iterable of ``app_class, action_class, records`` tuples.
+    """
+    if jobs > 1 and len(query_results) > 1:
+        context = get_fork_context()
+        if context is not None:
+            return parallel_app_records(context, directive, query_results,
+                                        jobs)
+    return serial_app_records(directive, query_results)
+
+
+def serial_app_records(directive, query_results):
+    attributes = Attributes()
+    for app_class, action_class, results in query_results:
+        yield app_class, action_class, action_records(
+            directive, app_class, results, attributes)
+
+
+# set in the parent process so that forked workers can find it
+worker_query = None
 
-        actions = list(query_app(app_class, directive, **filters))
 
-        if not actions:
+def parallel_app_records(context, directive, query_results, jobs):
+    global worker_query
+    worker_query = directive, query_results
+    pool = context.Pool(jobs)
+    try:
+        for i, records in enumerate(pool.imap(
+                worker_records, range(len(query_results)))):
+            app_class, action_class, results = query_results[i]
+            yield app_class, action_class, records
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+        worker_query = None
+
+
+def worker_records(i):
+    """Get the records for an app in a worker process.
+
+    :param i: the index of the app in the query results.
+    :return: a list of records.
+    """
+    directive, query_results = worker_query
+    app_class, action_class, results = query_results[i]
+    return list(action_records(directive, app_class, results, Attributes()))
+
+
+def get_fork_context():
+    """Get a multiprocessing context that forks worker processes.
+
+    :return: a context, or ``None`` if processes cannot be forked.
+    """
+    get_context = getattr(multiprocessing, 'get_context', None)
+    if get_context is None:
+        # Python 2 always forks, if the platform supports it
+        return multiprocessing if hasattr(os, 'fork') else None
+    try:
+        return get_context('fork')
+    except ValueError:
+        return None
+
+
+def action_records(directive, app_class, results, attributes):
+    app = dotted_name(app_class)
+    for action, obj in results:
+        code_info = action.code_info
+        if code_info is None:
+            path = lineno = sourceline = None
+        else:
+            path = code_info.path
+            lineno = code_info.lineno
+            sourceline = code_info.sourceline
+        yield {
+            'app': app,
+            'directive': directive,
+            'path': path,
+            'lineno': lineno,
+            'sourceline': sourceline,
+            'attributes': dict(
+                (name, value_text(value))
+                for name, value in attributes(action))
+        }
+
+
+def all_records(app_records):
+    for app_class, action_class, records in app_records:
+        for record in records:
+            yield record
+
+
+def format_text(app_records):
+    """Format records as human readable text.
+
+    Each record is shown by the location of its directive. Records of
+    actions not created by a directive have no location, so these are
+    shown by the directive name and attributes instead.
+
+    :param app_records: as returned by :func:`app_records`.
+    :return: iterable of lines.
+    """
+    for app_class, action_class, records in app_records:
+        records = iter(records)
+        for first in records:
+            break
+        else:
             continue
 
         yield "App: %r" % app_class
 
-        for action, obj in actions:
-            if action.directive is None:
-                continue  # XXX handle this case
-            yield "  %s" % action.directive.code_info.filelineno()
-            yield "  %s" % action.directive.code_info.sourceline
+        for record in chain([first], records):
+            if record['path'] is None:
+                # not created by a directive, so show what it is instead
+                yield "  %s %s" % (record['directive'], ' '.join(
+                    '%s=%s' % item
+                    for item in sorted(record['attributes'].items())))
+                yield ""
+                continue
+            yield '  File "%s", line %s' % (record['path'], record['lineno'])
+            yield "  %s" % record['sourceline']
             yield ""
 
 
+def format_json(app_records):
+    """Format records as a JSON array.
+
+    :param app_records: as returned by :func:`app_records`.
+    :return: iterable of lines.
+    """
+    separator = '['
+    for record in all_records(app_records):
+        yield separator + json.dumps(record, sort_keys=True)
+        separator = ','
+    yield ']' if separator == ',' else '[]'
+
+
+def format_ndjson(app_records):
+    """Format records as a JSON record per line.
+
+    :param app_records: as returned by :func:`app_records`.
+    :return: iterable of lines.
+    """
+    for record in all_records(app_records):
+        yield json.dumps(record, sort_keys=True)
+
+
+class LineBuffer(object):
+    def write(self, s):
+        self.line = s
+
+
+CSV_COLUMNS = ['app', 'directive', 'path', 'lineno', 'sourceline']
+
+
+def format_csv(app_records, action_classes=None):
+    """Format records as CSV with a header line.
+
+    There is a column for each item of a record (see
+    :func:`app_records`), and a column for each name that the
+    actions of the directive can be filtered on
+    (see :func:`filter_names`).
+
+    :param app_records: as returned by :func:`app_records`.
+    :param action_classes: the action classes of the directive queried
+      in each app. If not given, these are taken from ``app_records``,
+      which means all of them are collected before output starts.
+    :return: iterable of lines.
+    """
+    if action_classes is None:
+        app_records = list(app_records)
+        action_classes = [action_class
+                          for app_class, action_class, records in app_records]
+    names = set()
+    for action_class in action_classes:
+        if action_class is not None:
+            for query_class in expand_action_classes([action_class]):
+                names.update(filter_names(query_class))
+    names = sorted(names)
+    buffer = LineBuffer()
+    writer = csv.writer(buffer, lineterminator='')
+    writer.writerow(CSV_COLUMNS + names)
+    yield buffer.line
+    for record in all_records(app_records):
+        attributes = record['attributes']
+        writer.writerow(
+            ['' if record[column] is None else record[column]
+             for column in CSV_COLUMNS] +
+            [attributes.get(name, '') for name in names])
+        yield buffer.line
+
+
+FORMATS = {
+    'text': format_text,
+    'json': format_json,
+    'ndjson': format_ndjson,
+    'csv': format_csv,
+}
+
+
+class Attributes(object):
+    """Get the attributes of actions that can be filtered on.
+
+    The names that can be filtered on are determined once for each
+    action class.
+    """
+    def __init__(self):
+        self.getters_by_class = {}
+
+    def __call__(self, action):
+        """Get attributes of an action.
+
+        These are the ones for :func:`filter_names` and the keyword
+        arguments given to the directive, for those that have a value.
+
+        :param action: an :class:`Action` instance.
+        :return: a sorted list of ``name, value`` tuples.
+        """
+        action_class = action.__class__
+        getters = self.getters_by_class.get(action_class)
+        if getters is None:
+            getters = self.getters_by_class[action_class] = dict(
+                (name, value_getter(action_class, name))
+                for name in filter_names(action_class))
+        values = [(name, get(action)) for name, get in getters.items()]
+        if action.directive is not None:
+            # the directive may pass in values for **kw arguments
+            values.extend(
+                (name, action.get_value_for_filter(name))
+                for name in action.directive.kw
+                if name not in getters)
+        return sorted((name, value) for name, value in values
+                      if value is not NOT_FOUND)
+
+
+def filter_names(action_class):
+    """Get the names that actions of a class can be filtered on.
+
+    These are the names in :attr:`Action.filter_name` and the named
+    arguments of the constructor.
+
+    :param action_class: an :class:`Action` subclass.
+    :return: a sorted list of names.
+    """
+    result = set(action_class.filter_name)
+    init = getattr(action_class.__init__, '__func__', action_class.__init__)
+    try:
+        result.update(getargspec(init).args[1:])
+    except (TypeError, ValueError):
+        pass
+    return sorted(result)
+
+
+def value_text(value):
+    """Text form of a filter value.
+
+    Classes, functions and modules are represented by their dotted
+    name, as used by :func:`dectate.convert_dotted_name`. Other
+    values by their text representation.
+
+    :param value: a filter value.
+    :return: text.
+    """
+    if isinstance(value, string_types):
+        return value
+    if inspect.isclass(value) or inspect.isfunction(value):
+        return dotted_name(value)
+    if inspect.ismodule(value):
+        return value.__name__
+    return text_type(value)
+
+
 def query_app(app_class, directive, **filters):
     """Query a single app with raw filters.
 
@@ -86,13 +724,22 @@ def query_app(app_class, directive, **filters):
     :param ``**filters``: raw (unconverted) filter values.
     :return: iterable of ``action, obj`` tuples.
     """
+    return build_query(app_class, directive, filters)(app_class)
+
+
+def build_query(app_class, directive, filters):
+    """Build the query for a directive with raw filters.
+
+    :param app_class: a :class:`App` subclass to build the query for.
+    :param directive: name of directive to query.
+    :param filters: dict with raw (unconverted) filter values.
+    :return: a :class:`Query`, empty if there is no such directive.
+    """
     action_class = parse_directive(app_class, directive)
-    if action_class is not None:
-        filter_kw = convert_filters(action_class, filters)
-        query = Query(action_class).filter(**filter_kw)
-    else:
-        query = Query()  # empty query
-    return query(app_class)
+    if action_class is None:
+        return Query()  # empty query
+    filter_kw = convert_filters(action_class, filters)
+    return Query(action_class).filter(**filter_kw)
 
 
 def parse_directive(app_class, directive_name):
@@ -181,8 +828,17 @@ def convert_filters(action_class, filters):
     return result
 
 
+# maps dotted names to the module they are found in, and the attributes
+# to get from that module
+resolve_cache = {}
+
+
 def resolve_dotted_name(name, module=None):
     """Adapted from zope.dottedname
+
+    Which part of the name is a module is cached, but the module itself
+    is looked up in ``sys.modules`` each time, so that the result is up
+    to date after a module is reloaded.
     """
     name = name.split('.')
     if not name[0]:
@@ -195,14 +851,34 @@ def resolve_dotted_name(name, module=None):
             name.pop(0)
         name = module + name
 
-    used = name.pop(0)
-    found = __import__(used)
-    for n in name:
+    cached = resolve_cache.get(tuple(name))
+    if cached is not None:
+        module_name, attributes = cached
+        found = sys.modules.get(module_name)
+        if found is None:
+            found = importlib.import_module(module_name)
+        try:
+            for n in attributes:
+                found = getattr(found, n)
+            return found
+        except AttributeError:
+            del resolve_cache[tuple(name)]
+
+    used = name[0]
+    found = importlib.import_module(used)
+    module_name = used
+    attributes = []
+    for n in name[1:]:
         used += '.' + n
         try:
             found = getattr(found, n)
         except AttributeError:
-            __import__(used)
-            found = getattr(found, n)
-
+            found = importlib.import_module(used)
+        if inspect.ismodule(found) and found.__name__ == used:
+            module_name = used
+            attributes = []
+        else:
+            attributes.append(n)
+
+    resolve_cache[tuple(name)] = module_name, tuple(attributes)
     return found
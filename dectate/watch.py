@@ -0,0 +1,116 @@
+from __future__ import print_function
+
+import os
+import sys
+import time
+import traceback
+from .app import reload_modules, dependent_modules
+from .server import get_mtimes
+from .tool import source_paths
+
+
+class Watcher(object):
+    """Watch the source files of configuration and reload them.
+
+    The source files are those found by :func:`source_paths`. Files
+    are polled for changes. When a file changes, its module is reloaded
+    with :func:`dectate.reload_modules`: the directives used in it are
+    unregistered, the module is reloaded, which registers them anew,
+    and the affected app classes are committed again.
+
+    If a reloaded module defines app classes, the app classes are
+    replaced by their new versions. Directives from modules that were
+    not reloaded are not registered on these new classes.
+    """
+    def __init__(self, app_classes):
+        """
+        :param app_classes: the :class:`App` subclasses to watch.
+        """
+        self.app_classes = list(app_classes)
+        self.mtimes = get_mtimes(source_paths(self.app_classes))
+
+    def changed_paths(self):
+        """Get the paths of the files that changed since the last check.
+
+        :return: a set of paths.
+        """
+        mtimes = get_mtimes(source_paths(self.app_classes))
+        result = set(path for path, mtime in mtimes.items()
+                     if self.mtimes.get(path) != mtime)
+        self.mtimes = mtimes
+        return result
+
+    def reload(self, paths):
+        """Reload the modules for paths and commit again.
+
+        Uses :func:`dectate.reload_modules`.
+
+        :param paths: the paths of the files that changed.
+        :return: the names of the reloaded modules, including the
+          modules that depend on them.
+        """
+        names = dependent_modules(
+            [module.__name__ for module in modules_for_paths(paths)])
+        reload_modules(*names)
+        app_classes = []
+        for app_class in self.app_classes:
+            if app_class.__module__ in names:
+                app_class = getattr(sys.modules[app_class.__module__],
+                                    app_class.__name__)
+            app_classes.append(app_class)
+        self.app_classes = app_classes
+        return sorted(names)
+
+
+def modules_for_paths(paths):
+    """Get the loaded modules for source file paths.
+
+    :param paths: an iterable of paths.
+    :return: list of modules in the order in which they were loaded.
+    """
+    paths = set(os.path.abspath(path) for path in paths)
+    result = []
+    for module in list(sys.modules.values()):
+        filename = getattr(module, '__file__', None)
+        if filename is None:
+            continue
+        if filename.endswith(('.pyc', '.pyo')):
+            filename = filename[:-1]
+        if os.path.abspath(filename) in paths:
+            result.append(module)
+    return result
+
+
+def watch(app_classes, query, interval=1.0):
+    """Run a query each time the configuration changes.
+
+    Runs until interrupted.
+
+    :param app_classes: the :class:`App` subclasses to watch.
+    :param query: a function that takes a list of app classes and returns
+      the lines to output for them.
+    :param interval: the amount of seconds between checks for changes.
+    """
+    watcher = Watcher(app_classes)
+    output(query(watcher.app_classes))
+    try:
+        while True:
+            time.sleep(interval)
+            paths = watcher.changed_paths()
+            if not paths:
+                continue
+            try:
+                names = watcher.reload(paths)
+            except Exception:
+                traceback.print_exc()
+                continue
+            print("Reloaded: %s" % ', '.join(names))
+            output(query(watcher.app_classes))
+    except KeyboardInterrupt:
+        pass
+
+
+def output(lines):
+    for line in lines:
+        print(line)
+    sys.stdout.flush()
@@ -33,6 +33,11 @@ setup(
     install_requires=[
         'setuptools'
     ],
+    entry_points={
+        'console_scripts': [
+            'decq-client = dectate.client:query_client',
+        ]
+    },
     extras_require=dict(
         test=[
             'pytest >= 2.9.0',